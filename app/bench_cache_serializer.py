@@ -0,0 +1,68 @@
+"""
+Cache serializer microbenchmark against pickle:
+    python -m app.bench_cache_serializer --books 40 --rounds 2000
+"""
+
+import argparse
+import timeit
+from datetime import datetime, timezone
+from typing import Any
+
+from aiocache.serializers import PickleSerializer  # type: ignore
+
+from core.models.book import Author, Book, BooksPage
+from infrastructure.serializers import VersionedSerializer
+
+
+def make_books(count: int) -> list[Book]:
+    return [
+        Book(
+            isbn=f"{i:010d}",
+            title=f"The Book Number {i}: A Long Enough Subtitle",
+            category="Computers",
+            language="en",
+            pub_date=datetime(2000 + i % 24, 1, 1, tzinfo=timezone.utc),
+            authors=[Author(name="First Author"), Author(name="Second Author")],
+        )
+        for i in range(count)
+    ]
+
+
+def bench(name: str, serializer: Any, value: Any, rounds: int) -> None:
+    data = serializer.dumps(value)
+    assert serializer.loads(data) == value
+    dumps = timeit.timeit(lambda: serializer.dumps(value), number=rounds)
+    loads = timeit.timeit(lambda: serializer.loads(data), number=rounds)
+    print(
+        f"{name:<24}{len(data):>10}"
+        f"{dumps / rounds * 1e6:>14.1f}{loads / rounds * 1e6:>14.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--books", type=int, default=40, help="books per page")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    books = make_books(args.books)
+    payloads = {
+        "Book": books[0],
+        f"BooksPage({args.books})": BooksPage(books=books, size=len(books), total=1000),
+    }
+    serializers = {
+        "pickle": PickleSerializer(),
+        "versioned": VersionedSerializer(
+            models=[Book, BooksPage], compress_threshold=0
+        ),
+        "versioned+zlib": VersionedSerializer(models=[Book, BooksPage]),
+    }
+    for payload_name, value in payloads.items():
+        print(f"\n{payload_name}")
+        print(f"{'serializer':<24}{'bytes':>10}{'dumps, us':>14}{'loads, us':>14}")
+        for name, serializer in serializers.items():
+            bench(name, serializer, value, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
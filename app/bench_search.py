@@ -0,0 +1,162 @@
+"""
+Book search latency with and without the trigram indexes:
+    python -m app.bench_search --books 1000000 --rounds 20
+Seeds synthetic books (ISBNs starting with BENCH) up to --books, remove them
+with --cleanup. Without the indexes both rows show a sequential scan.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any
+
+from sqlalchemy import event, text
+
+from app.main import build_container
+from infrastructure.db.repositories.book import BookRepository
+from infrastructure.db.session_manager import ABCSessionManager
+from utils.settings import Settings
+
+WORDS = [
+    "history", "python", "garden", "ocean", "empire", "quantum", "kitchen",
+    "mountain", "silent", "economics", "winter", "machine", "river", "secret",
+    "modern", "ancient", "design", "children", "music", "theory", "war",
+    "journey", "language", "night", "city", "science", "love", "data",
+    "philosophy", "stars", "island", "medicine",
+]  # fmt: skip
+CATEGORIES = ["Fiction", "History", "Computers", "Science", "Cooking", "Travel"]
+TERMS = ["Quantum Of The Garden", "Ocean Empire Vol. 42", "philosoph", "xyz"]
+
+SEED_QUERY = text("""
+    INSERT INTO books (id, isbn, title, category, language, pub_date)
+    SELECT gen_random_uuid(), 'BENCH' || lpad(i::text, 8, '0'),
+        initcap(concat_ws(' ',
+            w[1 + i % 32], 'of the', w[1 + (i / 32) % 32], w[1 + (i / 1024) % 32],
+            'vol.', i % 97
+        )),
+        c[1 + i % 6], 'en',
+        timestamptz '1950-01-01' + (i % 27000) * interval '1 day'
+    FROM generate_series(:start, :stop - 1) AS i,
+        CAST(:words AS text[]) AS w, CAST(:categories AS text[]) AS c
+    ON CONFLICT (isbn) DO NOTHING
+""")
+
+
+def plan_nodes(plan: dict[str, Any]) -> list[str]:
+    nodes: list[str] = [plan["Node Type"]]
+    for child in plan.get("Plans", []):
+        nodes += plan_nodes(child)
+    return nodes
+
+
+class SearchBench:
+    """
+    Resolved by the container, so the repository uses the same session manager
+    """
+
+    def __init__(
+        self, book_repository: BookRepository, session_manager: ABCSessionManager
+    ) -> None:
+        self._book_repository = book_repository
+        self._session_manager = session_manager
+
+    async def seed(self, books: int) -> None:
+        async with self._session_manager.make_session() as session:
+            count = (
+                await session.execute(
+                    text("SELECT count(*) FROM books WHERE isbn LIKE 'BENCH%'")
+                )
+            ).scalar_one()
+        for start in range(count, books, 100_000):
+            async with self._session_manager.make_session() as session:
+                await session.execute(
+                    SEED_QUERY,
+                    {
+                        "words": WORDS,
+                        "categories": CATEGORIES,
+                        "start": start,
+                        "stop": min(start + 100_000, books),
+                    },
+                )
+            print(f"Seeded {min(start + 100_000, books)}/{books} books")
+        async with self._session_manager.make_session() as session:
+            await session.execute(text("ANALYZE books"))
+
+    async def cleanup(self) -> None:
+        async with self._session_manager.make_session() as session:
+            await session.execute(text("DELETE FROM books WHERE isbn LIKE 'BENCH%'"))
+
+    async def run(self, term: str, limit: int, rounds: int, indexes: bool) -> None:
+        """
+        Times a page of the search as the endpoint requests it, the plan is of
+        the books query the repository sends
+        """
+        statements: list[tuple[str, Any]] = []
+
+        def capture(*args: Any) -> None:
+            # conn, cursor, statement, parameters, context, executemany
+            statements.append((args[2], args[3]))
+
+        timings: list[float] = []
+        found = 0
+        async with self._session_manager.make_session() as session:
+            if not indexes:
+                await session.execute(text("SET LOCAL enable_bitmapscan = off"))
+                await session.execute(text("SET LOCAL enable_indexscan = off"))
+            connection = await session.connection()
+            event.listen(connection.sync_connection, "before_cursor_execute", capture)
+            for _ in range(rounds):
+                started = time.perf_counter()
+                found = len(await self._book_repository.search(title=term, limit=limit))
+                timings.append(time.perf_counter() - started)
+            event.remove(connection.sync_connection, "before_cursor_execute", capture)
+            statement, parameters = statements[0]
+            explain = (
+                await connection.exec_driver_sql(
+                    f"EXPLAIN (FORMAT JSON) {statement}", parameters
+                )
+            ).scalar_one()
+        plan: list[dict[str, Any]] = (
+            json.loads(explain) if isinstance(explain, str) else explain
+        )
+        print(
+            f"{term!r:<24}{'index' if indexes else 'no index':<10}{found:>8}"
+            f"{statistics.median(timings) * 1e3:>12.2f}"
+            f"{max(timings) * 1e3:>12.2f}   {' > '.join(plan_nodes(plan[0]['Plan']))}"
+        )
+
+
+async def run(args: argparse.Namespace) -> None:
+    container = build_container()
+    container.register(SearchBench)
+    bench: SearchBench = container.resolve(SearchBench)
+    if args.cleanup:
+        await bench.cleanup()
+        return
+    await bench.seed(args.books)
+    print(f"{'term':<24}{'scan':<10}{'found':>8}{'median ms':>12}{'max ms':>12}   plan")
+    for term in args.terms or TERMS:
+        for indexes in (True, False):
+            await bench.run(term, args.limit, args.rounds, indexes)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=Settings().search_limit,
+        help="page size, the endpoint default",
+    )
+    parser.add_argument("--terms", nargs="*", help="title substrings to search")
+    parser.add_argument("--cleanup", action="store_true", help="delete seeded books")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Bulk import of Google Books dump:
+    python -m app.import_books volumes.ndjson --batch-size 10000
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from app.main import build_container
+from core.services.book_import import BookImportService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", type=Path, help="NDJSON file with one volume per line")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    container = build_container()
+    service: BookImportService = container.resolve(BookImportService)
+    asyncio.run(service.import_file(args.path, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
+from core.models.book import Book, BooksPage
 from core.services.book import BookService
+from core.services.book_import import BookImportService
 from core.services.books_source import ABCBooksSource, GoogleBooksSource
-from infrastructure.caches import ABCCaches, Caches
-from infrastructure.container import Container
+from core.services.warmup import WarmupLifespan
+from infrastructure.caches import ABCCaches, Caches, CachesLifespan
+from infrastructure.circuit_breaker import ABCCircuitBreaker, CircuitBreaker
+from infrastructure.container import Container, Scope
 from infrastructure.db.abc_repository import BaseRepository
 from infrastructure.db.engine import ABCDatabaseEngine
 from infrastructure.db.repositories.book import BookRepository
@@ -9,14 +13,19 @@ from infrastructure.db.session_manager import ABCSessionManager, SessionManager
 from infrastructure.db.sqlalchemy.engine import SQLAlchemyEngine
 from infrastructure.db.sqlalchemy.repository import SQLAlchemyRepository
 from infrastructure.db.unitofwork import ABCUnitOfWork, SQLAlchemyUnitOfWork
-from infrastructure.http import ABCHTTPClient, HTTPXClient
+from infrastructure.hot_keys import ABCHotKeys, HotKeys
+from infrastructure.http import (ABCHTTPClient, HTTPClientLifespan,
+                                 HTTPXClient)
 from infrastructure.lifespan import ABCLifespan, EmptyLifespan
+from infrastructure.metrics import Metrics
+from infrastructure.rate_limiter import ABCRateLimiter, TokenBucketRateLimiter
 from presentation.asgi.abc_builder import ASGIApp, ASGIAppBuilder
 from presentation.asgi.fastapi.abc_router import ABCRouterBuilder
 from presentation.asgi.fastapi.auth import ABCAuthService, FastAPIUsersService
 from presentation.asgi.fastapi.builder import FastAPIAppBuilder
 from presentation.asgi.routes.auth import AuthRouterBuilder
 from presentation.asgi.routes.book import BookRouterBuilder
+from presentation.asgi.routes.metrics import MetricsRouterBuilder
 from presentation.asgi.routes.user import UserRouterBuilder
 from utils.logging import Logging
 from utils.settings import Settings
@@ -33,17 +42,94 @@ def build_container() -> Container:
 
     # INFRASTRUCTURE
     container.register(Logging, instance=logging)
+    container.register(Metrics, instance=Metrics())
     container.register(ABCLifespan, EmptyLifespan)
-    container.register(ABCHTTPClient, HTTPXClient)
+    container.register(ABCLifespan, HTTPClientLifespan)
     container.register(
-        ABCBooksSource, GoogleBooksSource, api_key=settings.google_api_key
+        ABCHTTPClient,
+        HTTPXClient,
+        scope=Scope.singleton,
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+        http2=settings.http_http2,
+        timeout=settings.http_timeout,
+        hosts_max_connections=settings.http_hosts_max_connections,
+        max_attempts=settings.http_max_attempts,
+        max_retry_wait=settings.http_max_retry_wait,
+        # Kept no longer than the results cached from them
+        validators_ttl=min(settings.http_validators_ttl, settings.cache_ttl),
     )
     container.register(
-        ABCCaches, Caches, url=settings.cache_url, ttl=settings.cache_ttl
+        ABCBooksSource,
+        GoogleBooksSource,
+        api_key=settings.google_api_key,
+        page_size=settings.google_books_page_size,
+        prefetch_pages=settings.google_books_prefetch_pages,
+        max_books=settings.google_books_max_books,
+    )
+    container.register(
+        ABCRateLimiter,
+        TokenBucketRateLimiter,
+        scope=Scope.singleton,
+        rate=settings.google_books_rate,
+        capacity=settings.google_books_burst,
+        max_wait=settings.google_books_rate_limit_wait,
+    )
+    container.register(
+        ABCCircuitBreaker,
+        CircuitBreaker,
+        scope=Scope.singleton,
+        name="Google Books",
+        failure_threshold=settings.google_books_failure_threshold,
+        recovery_timeout=settings.google_books_recovery_timeout,
+    )
+    container.register(
+        ABCCaches,
+        Caches,
+        scope=Scope.singleton,
+        url=settings.cache_url,
+        ttl=settings.cache_ttl,
+        soft_ttl=settings.cache_soft_ttl,
+        refresh_ahead=settings.cache_refresh_ahead,
+        negative_ttl=settings.cache_negative_ttl,
+        lock_lease=settings.cache_lock_lease,
+        lock_poll_interval=settings.cache_lock_poll_interval,
+        memory_ttl=settings.cache_memory_ttl,
+        memory_max_entries=settings.cache_memory_max_entries,
+        memory_max_bytes=settings.cache_memory_max_bytes,
+        models=[Book, BooksPage],
+        compress_threshold=settings.cache_compress_threshold,
+    )
+    container.register(ABCLifespan, CachesLifespan)
+    container.register(
+        ABCHotKeys,
+        HotKeys,
+        scope=Scope.singleton,
+        ttl=settings.hot_keys_ttl,
+        max_keys=settings.hot_keys_max,
     )
 
     # SERVICES
-    container.register(BookService)
+    container.register(
+        BookService,
+        BookService,
+        batch_concurrency=settings.batch_concurrency,
+        batch_max_items=settings.batch_max_items,
+        upsert_batch_size=settings.upsert_batch_size,
+        search_limit=settings.search_limit,
+        search_max_limit=settings.search_max_limit,
+    )
+    container.register(BookImportService)
+    container.register(
+        ABCLifespan,
+        WarmupLifespan,
+        top_n=settings.warmup_top_n,
+        isbns=settings.warmup_isbns,
+        categories=settings.warmup_categories,
+        concurrency=settings.warmup_concurrency,
+        budget=settings.warmup_budget,
+    )
 
     # REPOSITORIES
     container.register(BookRepository)
@@ -52,12 +138,34 @@ def build_container() -> Container:
     container.register(BaseRepository, SQLAlchemyRepository)
     container.register(ABCUnitOfWork, SQLAlchemyUnitOfWork)
     container.register(ABCSessionManager, SessionManager)
-    container.register(ABCDatabaseEngine, SQLAlchemyEngine, url=settings.db_url)
+    container.register(
+        ABCDatabaseEngine,
+        SQLAlchemyEngine,
+        scope=Scope.singleton,
+        url=settings.db_url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        statement_cache_size=settings.db_statement_cache_size,
+        pgbouncer=settings.db_pgbouncer,
+        replica_urls=settings.db_replica_urls,
+        read_your_writes=settings.db_read_your_writes,
+        replica_cooldown=settings.db_replica_cooldown,
+        replica_connect_timeout=settings.db_replica_connect_timeout,
+    )
 
     # ROUTES
     container.register(ABCRouterBuilder, AuthRouterBuilder)
     container.register(ABCRouterBuilder, UserRouterBuilder)
-    container.register(ABCRouterBuilder, BookRouterBuilder)
+    container.register(ABCRouterBuilder, MetricsRouterBuilder)
+    container.register(
+        ABCRouterBuilder,
+        BookRouterBuilder,
+        deadline=settings.request_deadline,
+        cache_control=settings.response_cache_control,
+    )
 
     # ASGI App
     container.register(
@@ -66,7 +174,14 @@ def build_container() -> Container:
         secret=settings.secret_key,
         token_url=settings.openapi_token_url,
     )
-    container.register(ASGIAppBuilder, FastAPIAppBuilder)
+    container.register(
+        ASGIAppBuilder,
+        FastAPIAppBuilder,
+        # Only replicas lag behind the writes
+        read_your_writes=(
+            settings.db_read_your_writes if settings.db_replica_urls else 0
+        ),
+    )
     return container
 
 
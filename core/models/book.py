@@ -1,4 +1,5 @@
 from datetime import datetime
+from uuid import UUID
 
 from pydantic import BaseModel
 
@@ -15,3 +16,25 @@ class Book(BaseModel):
 
 class Author(BaseModel):
     name: str
+
+
+class StoredAuthor(Author):
+    id: UUID
+
+
+class StoredBook(Book):
+    """
+    Book read from the database
+    """
+
+    id: UUID
+    created_at: datetime
+    updated_at: datetime
+
+    authors: list[StoredAuthor]  # type: ignore
+
+
+class BooksPage(BaseModel):
+    books: list[Book]
+    size: int  # items returned by the source, including unparsable ones
+    total: int
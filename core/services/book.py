@@ -1,13 +1,19 @@
-from typing import Any
+import asyncio
+import base64
+import hashlib
+from functools import partial
+from typing import Any, Awaitable, Callable
 from uuid import UUID
 
-from core.models.book import Book
+from core.models.book import Book, StoredBook
 from core.services.books_source import ABCBooksSource
 from infrastructure.db.exceptions import exc
 from infrastructure.db.repositories.book import BookRepository
 from infrastructure.db.session_manager import ABCSessionManager
-from utils.exceptions import AppError
+from infrastructure.hot_keys import ABCHotKeys
+from utils.exceptions import AppError, ExternalServiceError, ExternalValueError
 from utils.logging import Logging
+from utils.normalization import Normalization
 
 
 class BookService:
@@ -17,46 +23,199 @@ class BookService:
         book_repository: BookRepository,
         session_manager: ABCSessionManager,
         books_source: ABCBooksSource,
+        hot_keys: ABCHotKeys,
+        batch_concurrency: int = 8,
+        batch_max_items: int = 100,
+        upsert_batch_size: int = 40,
+        search_limit: int = 20,
+        search_max_limit: int = 100,
     ):
         self._logger = logging.get_logger(__name__)
         self._book_repository = book_repository
         self._session_manager = session_manager
         self._books_source = books_source
+        self._hot_keys = hot_keys
+        self._batch_concurrency = batch_concurrency
+        self._batch_max_items = batch_max_items
+        self._upsert_batch_size = upsert_batch_size
+        self._search_limit = search_limit
+        self._search_max_limit = search_max_limit
 
-    async def _create_if_not_exists(self, book: Book):
-        try:
+    async def _fallback(self, error: ExternalServiceError, **kwargs: Any):
+        """
+        Serve a page of local data while the external service is unavailable
+        """
+        self._logger.warning(f"{error}. Falling back to local books: {kwargs}")
+        async with self._session_manager.make_session(read_only=True):
             books = await self._book_repository.filter_by(
-                isbn=book.isbn, title=book.title
+                limit=self._search_limit, **kwargs
             )
-            return books[0]
-        except (exc.NoResultFound, IndexError):
-            self._logger.debug(f"Creating book {book}")
-            return await self._book_repository.create_book(book)
+        if not books:
+            raise error
+        return books
 
     async def get_by_id(self, id_: UUID):
-        async with self._session_manager.make_session():
+        async with self._session_manager.make_session(read_only=True):
             try:
                 return await self._book_repository.get_book_by_id(id_)
             except exc.NoResultFound:
                 raise AppError("Book not found") from None
 
+    @staticmethod
+    def _version(*parts: Any) -> str:
+        return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+    async def get_version(self, id_: UUID) -> str:
+        """
+        Changes whenever the book is updated, the book itself isn't loaded
+        """
+        async with self._session_manager.make_session(read_only=True):
+            try:
+                updated_at = await self._book_repository.get_book_version(id_)
+            except exc.NoResultFound:
+                raise AppError("Book not found") from None
+        return self._version(id_, updated_at)
+
     async def fetch_by_id(self, id_: str):
         book = await self._books_source.get_book_by_id(id_)
         async with self._session_manager.make_session():
-            return await self._create_if_not_exists(book)
+            return (await self._book_repository.upsert_books([book]))[0]
 
     async def fetch_by_isbn(self, isbn: str):
-        books = await self._books_source.get_books_by_isbn(isbn)
+        isbn = Normalization.isbn(isbn)
+        try:
+            books = await self._books_source.get_books_by_isbn(isbn)
+        except ExternalServiceError as e:
+            return await self._fallback(e, isbn=isbn)
+        await self._hot_keys.record("isbn", isbn)
         async with self._session_manager.make_session():
-            return [await self._create_if_not_exists(book) for book in books]
+            return await self._book_repository.upsert_books(books)
 
-    async def fetch_by_category(self, category: str):
-        books = await self._books_source.get_books_by_category(category)
+    async def _upsert(self, books: list[Book]) -> list[StoredBook]:
         async with self._session_manager.make_session():
-            books = [await self._create_if_not_exists(book) for book in books]
-            self._logger.debug([book.isbn for book in books])
-            return books
+            return await self._book_repository.upsert_books(books)
+
+    async def fetch_by_category(self, category: str):
+        """
+        Streamed books are written in batches as they arrive, each batch in its
+        own transaction, so the written ones are kept if the upstream fails
+        """
+        stored: list[StoredBook] = []
+        batch: list[Book] = []
+        try:
+            async for book in self._books_source.iter_books_by_category(category):
+                batch.append(book)
+                if len(batch) >= self._upsert_batch_size:
+                    stored += await self._upsert(batch)
+                    batch = []
+        except ExternalServiceError as e:
+            if not stored and not batch:
+                return await self._fallback(
+                    e, category=Normalization.category(category)
+                )
+            self._logger.warning(
+                f"{e}. Keeping {len(stored) + len(batch)} fetched books"
+            )
+        if batch:
+            stored += await self._upsert(batch)
+        self._logger.debug([book.isbn for book in stored])
+        await self._hot_keys.record("category", Normalization.category(category))
+        return stored
 
-    async def search(self, **kwargs: Any):
+    async def _fetch_batch_item(
+        self, semaphore: asyncio.Semaphore, fetch: Callable[[], Awaitable[list[Book]]]
+    ) -> list[Book] | str:
+        """
+        Returns fetched books or error message
+        """
+        async with semaphore:
+            try:
+                return await fetch()
+            except AppError as e:
+                return str(e)
+            except Exception as e:
+                self._logger.error(f"Batch item failed: {type(e).__name__}: {e}")
+                return "Internal server error"
+
+    async def _get_book_by_id(self, id_: str) -> list[Book]:
+        return [await self._books_source.get_book_by_id(id_)]
+
+    async def fetch_batch(self, isbns: list[str], ids: list[str]):
+        """
+        Fetch many books concurrently and write them in one transaction.
+        Returns result for every requested item in the same order.
+        """
+        if len(isbns) + len(ids) > self._batch_max_items:
+            raise AppError(f"Batch is limited to {self._batch_max_items} items")
+        items: list[tuple[str, str, Callable[[], Awaitable[list[Book]]]]] = [
+            ("isbn", isbn, partial(self._books_source.get_books_by_isbn, isbn))
+            for isbn in isbns
+        ] + [("id", id_, partial(self._get_book_by_id, id_)) for id_ in ids]
+
+        semaphore = asyncio.Semaphore(self._batch_concurrency)
+        fetched = await asyncio.gather(
+            *(self._fetch_batch_item(semaphore, fetch) for _, _, fetch in items)
+        )
+
+        found = [
+            book for books in fetched if not isinstance(books, str) for book in books
+        ]
         async with self._session_manager.make_session():
-            return await self._book_repository.search(**kwargs)
+            models = iter(await self._book_repository.upsert_books(found))
+
+        results: list[dict[str, Any]] = []
+        for (kind, key, _), books in zip(items, fetched, strict=True):
+            if isinstance(books, str):
+                results.append({kind: key, "books": [], "error": books})
+                continue
+            results.append({
+                kind: key,
+                "books": [next(models) for _ in books],
+                "error": None,
+            })
+        return results
+
+    @staticmethod
+    def _encode_cursor(id_: UUID) -> str:
+        return base64.urlsafe_b64encode(id_.bytes).rstrip(b"=").decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> UUID:
+        try:
+            return UUID(bytes=base64.urlsafe_b64decode(cursor + "=="))
+        except ValueError:
+            raise ExternalValueError("Invalid cursor") from None
+
+    async def search(
+        self,
+        text: str | None = None,
+        cursor: str | None = None,
+        limit: int | None = None,
+        **kwargs: Any,
+    ) -> tuple[list[StoredBook], str | None]:
+        """
+        Page of found books and the cursor of the next one, None on the last
+        page. Pages have search_limit books unless a lower limit is given.
+        text: full-text query, only its most relevant books are returned
+        """
+        limit = min(limit or self._search_limit, self._search_max_limit)
+        after = None if cursor is None else self._decode_cursor(cursor)
+        async with self._session_manager.make_session(read_only=True):
+            # One extra book tells whether there is a next page
+            books = list(
+                await self._book_repository.search(
+                    text=text, after=after, limit=limit + 1, **kwargs
+                )
+            )
+        if len(books) <= limit or text is not None:
+            return books[:limit], None
+        return books[:limit], self._encode_cursor(books[limit - 1].id)
+
+    def page_version(self, books: list[StoredBook], next_cursor: str | None) -> str:
+        """
+        Changes whenever books of the page are added, deleted or updated. It is
+        derived from the page, so revalidating a deep page costs one page read.
+        """
+        return self._version(
+            next_cursor, [(book.id, book.updated_at) for book in books]
+        )
@@ -0,0 +1,66 @@
+import json
+import time
+from pathlib import Path
+from typing import Iterator
+
+from core.models.book import Book
+from core.services.books_source import GoogleBooksSource
+from infrastructure.db.repositories.book import BookRepository
+from infrastructure.db.session_manager import ABCSessionManager
+from utils.logging import Logging
+
+
+class BookImportService:
+    def __init__(
+        self,
+        logging: Logging,
+        book_repository: BookRepository,
+        session_manager: ABCSessionManager,
+    ) -> None:
+        self._logger = logging.get_logger(__name__)
+        self._book_repository = book_repository
+        self._session_manager = session_manager
+        self._read = 0
+        self._skipped = 0
+
+    def _read_batches(self, path: Path, batch_size: int) -> Iterator[list[Book]]:
+        """
+        Lines are Google Books volumes or their volumeInfo records
+        """
+        batch: list[Book] = []
+        with path.open(encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                self._read += 1
+                try:
+                    data = json.loads(line)
+                    batch.append(GoogleBooksSource._from_dict(  # type: ignore
+                        data.get("volumeInfo", data)
+                    ))
+                except (KeyError, IndexError, ValueError, AttributeError, TypeError):
+                    self._skipped += 1
+                    continue
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    async def import_file(self, path: Path, batch_size: int = 10_000) -> int:
+        """
+        Stream NDJSON dump into the database batch by batch.
+        Returns the number of inserted books.
+        """
+        self._read = self._skipped = 0
+        imported = 0
+        started = time.monotonic()
+        for batch in self._read_batches(path, batch_size):
+            async with self._session_manager.make_session():
+                imported += await self._book_repository.import_books(batch)
+            elapsed = time.monotonic() - started
+            self._logger.info(
+                f"Read {self._read}, skipped {self._skipped}, imported {imported}"
+                f" in {elapsed:.1f}s ({self._read / elapsed:.0f} rows/s)"
+            )
+        return imported
@@ -1,13 +1,20 @@
+import asyncio
+from collections import deque
 from datetime import datetime
-from typing import Any, Protocol
+from functools import partial
+from typing import Any, AsyncIterator, Protocol
 
 import pytz
 
-from core.models.book import Author, Book
+from core.models.book import Author, Book, BooksPage
 from infrastructure.caches import ABCCaches
+from infrastructure.circuit_breaker import ABCCircuitBreaker
 from infrastructure.http import ABCHTTPClient
-from utils.exceptions import ExternalValueError
+from infrastructure.rate_limiter import ABCRateLimiter
+from utils.exceptions import (AppError, ExternalServiceError, ExternalValueError,
+                              NotFoundError)
 from utils.logging import Logging
+from utils.normalization import Normalization
 
 
 class ABCBooksSource(Protocol):
@@ -17,6 +24,17 @@ class ABCBooksSource(Protocol):
     async def search_books(self, query: str) -> list[Book]:
         raise NotImplementedError
 
+    async def search_page(
+        self, query: str, start_index: int, max_results: int
+    ) -> BooksPage:
+        raise NotImplementedError
+
+    def iter_books(self, query: str) -> AsyncIterator[Book]:
+        raise NotImplementedError
+
+    def iter_books_by_category(self, category: str) -> AsyncIterator[Book]:
+        raise NotImplementedError
+
     async def get_books_by_isbn(self, isbn: str) -> list[Book]:
         raise NotImplementedError
 
@@ -30,19 +48,29 @@ class GoogleBooksSource(ABCBooksSource):
         logging: Logging,
         http_client: ABCHTTPClient,
         caches: ABCCaches,
+        rate_limiter: ABCRateLimiter,
+        circuit_breaker: ABCCircuitBreaker,
         api_key: str,
+        page_size: int = 40,
+        prefetch_pages: int = 2,
+        max_books: int = 400,
     ) -> None:
         self._logger = logging.get_logger(__name__)
         self._http_client = http_client
+        self._rate_limiter = rate_limiter
+        self._circuit_breaker = circuit_breaker
 
         self._api_url = "https://www.googleapis.com/books/v1/volumes"
         self._api_params = {"key": api_key}
+        self._page_size = page_size  # Google Books allows at most 40
+        self._prefetch_pages = prefetch_pages
+        self._max_books = max_books
 
-        self.get_book_by_id = caches.distributed_decorator(
+        self.get_book_by_id = caches.tiered_decorator(
             self.get_book_by_id,
         )
-        self.search_books = caches.distributed_decorator(
-            self.search_books,
+        self.search_page = caches.tiered_decorator(
+            self.search_page,
         )
 
     @classmethod
@@ -70,41 +98,109 @@ class GoogleBooksSource(ABCBooksSource):
             authors=[Author(name=author) for author in data["authors"]],
         )
 
+    async def _request(self, url: str, params: dict[str, Any]) -> dict[str, Any]:
+        await self._rate_limiter.acquire(self._api_url)
+        try:
+            response = await self._http_client.get_conditional(
+                url=url,
+                params={**self._api_params, **params},
+            )
+        except AppError:
+            raise
+        except Exception as e:
+            raise ExternalServiceError(f"Google Books request failed: {e}") from e
+        if "error" in response:
+            error = response["error"]
+            if error.get("code") == 429 or error.get("code", 0) >= 500:
+                raise ExternalServiceError(error["message"])
+            if error.get("code") == 404:
+                raise NotFoundError(error["message"])
+            raise ExternalValueError(error["message"])
+        return response
+
+    async def _get(self, url: str, **params: Any) -> dict[str, Any]:
+        return await self._circuit_breaker.call(partial(self._request, url, params))
+
     async def get_book_by_id(self, id_: str) -> Book:
         self._logger.debug(f"Cache is empty. Fetching book by id: {id_}")
-        response = await self._http_client.get(
-            url=f"{self._api_url}/{id_}",
-            params=self._api_params,
-        )
-        if "error" in response:
-            raise ExternalValueError(response["error"]["message"])
+        response = await self._get(f"{self._api_url}/{id_}")
         try:
             return self._from_dict(response["volumeInfo"])
         except (KeyError, IndexError, ValueError):
-            raise ExternalValueError("No book found") from None
+            raise NotFoundError("No book found") from None
 
-    async def search_books(self, query: str) -> list[Book]:
-        self._logger.debug(f"Cache is empty. Fetching books by query: {query}")
-        response = await self._http_client.get(
-            url=self._api_url,
-            params={**self._api_params, "q": query},
+    async def search_page(
+        self, query: str, start_index: int, max_results: int
+    ) -> BooksPage:
+        self._logger.debug(
+            f"Cache is empty. Fetching books by query: {query} from {start_index}"
         )
-        if "error" in response:
-            raise ExternalValueError(response["error"]["message"])
-        # self._logger.debug(response)
+        response = await self._get(
+            self._api_url, q=query, startIndex=start_index, maxResults=max_results
+        )
+        if not start_index and not response.get("totalItems"):
+            raise NotFoundError("No books found")
+        items = response.get("items", [])
         books: list[Book] = []
-        for book in response["items"]:
+        for book in items:
             try:
                 books.append(self._from_dict(book["volumeInfo"]))
             except (KeyError, IndexError, ValueError):
                 pass
                 # self._logger.debug(f"Error: {e} with book: {book}")
-        if not books:
+        return BooksPage(
+            books=books, size=len(items), total=response.get("totalItems", 0)
+        )
+
+    async def search_books(self, query: str) -> list[Book]:
+        page = await self.search_page(query, 0, self._page_size)
+        if not page.books:
             raise ExternalValueError("No books found") from None
-        return books
+        return page.books
+
+    async def iter_books(self, query: str) -> AsyncIterator[Book]:
+        """
+        Yield books page by page, prefetching next pages concurrently
+        """
+        pages: deque[asyncio.Task[BooksPage]] = deque()
+        next_index = 0
+        total: int | None = None
+        is_found = False
+        try:
+            while True:
+                # Only the first page is fetched until the total is known
+                in_flight = 1 if total is None else self._prefetch_pages + 1
+                while (
+                    len(pages) < in_flight
+                    and next_index < min(self._max_books, total or self._max_books)
+                ):
+                    size = min(self._page_size, self._max_books - next_index)
+                    pages.append(
+                        asyncio.create_task(self.search_page(query, next_index, size))
+                    )
+                    next_index += size
+                if not pages:
+                    break
+                page = await pages.popleft()
+                total = page.total
+                for book in page.books:
+                    is_found = True
+                    yield book
+                if not page.size:
+                    break
+        finally:
+            for task in pages:
+                task.cancel()
+        if not is_found:
+            raise ExternalValueError("No books found")
 
     async def get_books_by_isbn(self, isbn: str) -> list[Book]:
-        return await self.search_books(f"isbn:{isbn}")
+        return await self.search_books(f"isbn:{Normalization.isbn(isbn)}")
 
     async def get_books_by_category(self, category: str) -> list[Book]:
-        return await self.search_books(f"subject:{category}")
+        return await self.search_books(
+            f"subject:{Normalization.category(category)}"
+        )
+
+    def iter_books_by_category(self, category: str) -> AsyncIterator[Book]:
+        return self.iter_books(f"subject:{Normalization.category(category)}")
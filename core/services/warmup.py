@@ -0,0 +1,123 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+from core.services.books_source import ABCBooksSource
+from infrastructure.db.repositories.book import BookRepository
+from infrastructure.db.session_manager import ABCSessionManager
+from infrastructure.deadline import Deadline
+from infrastructure.hot_keys import ABCHotKeys
+from infrastructure.lifespan import ABCLifespan
+from utils.exceptions import AppError
+from utils.logging import Logging
+
+
+class WarmupLifespan(ABCLifespan[None]):
+    """
+    Preloads the most requested ISBNs and categories into the cache tiers
+    before the worker starts serving. Keys come from the configured lists
+    and the hot-key log, or from the books table if the log is empty.
+    """
+
+    def __init__(
+        self,
+        logging: Logging,
+        hot_keys: ABCHotKeys,
+        books_source: ABCBooksSource,
+        book_repository: BookRepository,
+        session_manager: ABCSessionManager,
+        top_n: int = 100,
+        isbns: list[str] | None = None,
+        categories: list[str] | None = None,
+        concurrency: int = 4,
+        budget: float = 10.0,
+    ) -> None:
+        """
+        top_n: keys of each kind taken from the traffic, 0 disables it
+        budget: max seconds the startup waits for the warm-up
+        """
+        self._logger = logging.get_logger(__name__)
+        self._hot_keys = hot_keys
+        self._books_source = books_source
+        self._book_repository = book_repository
+        self._session_manager = session_manager
+        self._top_n = top_n
+        self._isbns = isbns or []
+        self._categories = categories or []
+        self._concurrency = concurrency
+        self._budget = budget
+        self._warmed = 0
+
+    async def _top_keys(self) -> tuple[list[str], list[str]]:
+        isbns = await self._hot_keys.top("isbn", self._top_n)
+        categories = await self._hot_keys.top("category", self._top_n)
+        if isbns or categories:
+            return isbns, categories
+        self._logger.info("Hot-key log is empty, warming up from the books table")
+        async with self._session_manager.make_session(read_only=True):
+            isbns = await self._book_repository.recent_isbns(self._top_n)
+            categories = await self._book_repository.top_categories(self._top_n)
+        return list(isbns), list(categories)
+
+    async def _warm(
+        self,
+        semaphore: asyncio.Semaphore,
+        fetch: Callable[[str], Awaitable[Any]],
+        key: str,
+    ) -> None:
+        async with semaphore:
+            try:
+                await fetch(key)
+            except AppError as e:
+                self._logger.debug(f"Warm-up of {key} failed: {e}")
+                return
+            except Exception as e:
+                self._logger.error(f"Warm-up of {key} failed: {type(e).__name__}: {e}")
+                return
+            self._warmed += 1
+
+    async def _warm_up(self) -> int:
+        isbns, categories = list(self._isbns), list(self._categories)
+        if self._top_n:
+            top_isbns, top_categories = await self._top_keys()
+            isbns += top_isbns
+            categories += top_categories
+        items = [
+            (self._books_source.get_books_by_isbn, isbn)
+            for isbn in dict.fromkeys(isbns)
+        ] + [
+            (self._books_source.get_books_by_category, category)
+            for category in dict.fromkeys(categories)
+        ]
+        semaphore = asyncio.Semaphore(self._concurrency)
+        await asyncio.gather(
+            *(self._warm(semaphore, fetch, key) for fetch, key in items)
+        )
+        return len(items)
+
+    async def __aenter__(self) -> None:
+        if not (self._top_n or self._isbns or self._categories):
+            return
+        started = time.monotonic()
+        total: int | str = "?"
+        try:
+            with Deadline.start(self._budget):
+                async with asyncio.timeout(self._budget):
+                    total = await self._warm_up()
+        except TimeoutError:
+            self._logger.warning(f"Warm-up is out of its {self._budget}s budget")
+        except Exception as e:
+            # Cold caches shouldn't prevent the worker from starting
+            self._logger.error(f"Warm-up failed: {type(e).__name__}: {e}")
+        self._logger.info(
+            f"Warmed up {self._warmed}/{total} keys"
+            f" in {time.monotonic() - started:.1f}s"
+        )
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: Any,
+    ) -> None:
+        pass
@@ -1,13 +1,24 @@
-from functools import cached_property, wraps
+import asyncio
+import contextvars
+import math
+import time
+import uuid
+from functools import cached_property, partial, wraps
 from typing import (Any, Awaitable, Callable, Coroutine, ParamSpec, Protocol,
-                    TypeVar)
+                    Sequence, TypeVar)
 from urllib.parse import urlparse
 
 from aiocache import BaseCache  # type: ignore
-from aiocache import cached as aiocache_cached  # type: ignore
 from aiocache import caches as aiocache_caches  # type: ignore
 from aiocache.lock import RedLock  # type: ignore
+from pydantic import BaseModel
 
+from infrastructure.deadline import Deadline
+from infrastructure.lifespan import ABCLifespan
+from infrastructure.memory_cache import LRUMemoryCache
+from infrastructure.metrics import SIZE_BUCKETS, Metrics
+from infrastructure.serializers import CacheEntry, NegativeEntry
+from utils.exceptions import NotFoundError
 from utils.logging import Logging
 
 T = TypeVar("T")
@@ -15,6 +26,55 @@ P = ParamSpec("P")
 _A = Awaitable
 _C = Callable
 _G = Coroutine
+Cache = BaseCache | LRUMemoryCache
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one in-flight call
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Future[Any]] = {}
+
+    def _done(self, key: str, future: asyncio.Future[Any]) -> None:
+        self._calls.pop(key, None)
+        if not future.cancelled():
+            future.exception()  # mark as retrieved if every caller has gone
+
+    async def do(self, key: str, func: _C[[], _G[Any, Any, T]]) -> T:
+        future = self._calls.get(key)
+        if future is None:
+            # Out of the caller context, so a short deadline of one caller
+            # doesn't fail the call for the others. Each waits up to its own.
+            future = asyncio.get_running_loop().create_task(
+                func(), context=contextvars.Context()
+            )
+            self._calls[key] = future
+            future.add_done_callback(partial(self._done, key))
+        # A cancelled caller must not cancel the call shared with the others
+        return await Deadline.wait_for(asyncio.shield(future))
+
+
+class TryRedLock(RedLock):
+    """
+    RedLock that doesn't wait for the owner. RedLock only waits for owners
+    from the same process, so other workers have to poll for the result.
+    """
+
+    async def try_acquire(self) -> bool:
+        self._value = str(uuid.uuid4())
+        try:
+            await self.client._add(  # type: ignore
+                self.key, self._value, ttl=self.lease
+            )
+        except ValueError:
+            return False
+        RedLock._EVENTS[self.key] = asyncio.Event()
+        return True
+
+    async def release(self) -> None:
+        await self._release()  # type: ignore
 
 
 class ABCCaches(Protocol):
@@ -22,7 +82,7 @@ class ABCCaches(Protocol):
     def lock(self) -> type[RedLock]: ...
 
     @cached_property
-    def memory(self) -> BaseCache: ...
+    def memory(self) -> LRUMemoryCache: ...
 
     def memory_decorator(self, func: _C[P, _A[T]]) -> _C[P, _G[Any, Any, T]]: ...
 
@@ -31,15 +91,69 @@ class ABCCaches(Protocol):
 
     def distributed_decorator(self, func: _C[P, _A[T]]) -> _C[P, _G[Any, Any, T]]: ...
 
+    def tiered_decorator(self, func: _C[P, _A[T]]) -> _C[P, _G[Any, Any, T]]:
+        """
+        Memory tier in front of the distributed one
+        """
+        ...
+
+    async def invalidate(self, key: str) -> None: ...
+
+    async def start(self) -> None: ...
+
+    async def close(self) -> None: ...
+
 
 class Caches(ABCCaches):
-    def __init__(self, logging: Logging, url: str, ttl: int) -> None:
+    def __init__(
+        self,
+        logging: Logging,
+        metrics: Metrics,
+        url: str,
+        ttl: int,
+        soft_ttl: int = 0,
+        refresh_ahead: float = 0,
+        negative_ttl: int = 0,
+        lock_lease: float = 0,
+        lock_poll_interval: float = 0.05,
+        memory_ttl: int = 60,
+        memory_max_entries: int = 10_000,
+        memory_max_bytes: int = 64 * 1024 * 1024,
+        models: Sequence[type[BaseModel]] = (),
+        compress_threshold: int = 1024,
+    ) -> None:
+        """
+        ttl: max age of the entries
+        soft_ttl: age after which entries are served stale and reloaded
+            in the background, 0 disables stale-while-revalidate
+        refresh_ahead: time before soft_ttl to reload the entries being read
+        negative_ttl: max age of cached NotFoundError, 0 disables negative caching
+        lock_lease: max time other workers wait for the one fetching a missed key,
+            0 disables cross-worker coalescing
+        memory_ttl: max age of the memory tier entries, bounds staleness
+            if an invalidation message is lost
+        models: pydantic models stored in the distributed cache
+        compress_threshold: min size of the distributed entries to compress
+        """
         self._logger = logging.get_logger(__name__)
         url_parsed = urlparse(url)
         self._ttl = ttl
+        self._soft_ttl = min(soft_ttl, ttl)
+        self._refresh_ahead = refresh_ahead
+        self._refreshes: dict[str, asyncio.Task[None]] = {}
+        self._negative_ttl = min(negative_ttl, ttl)
+        self._lock_lease = lock_lease
+        self._lock_poll_interval = lock_poll_interval
+        self._memory_ttl = min(memory_ttl, ttl)
+        self._single_flight = SingleFlight()
+
+        self._id = uuid.uuid4().hex  # to skip own invalidation messages
+        self._channel = "caches-invalidation"
+        self._listener: asyncio.Task[None] | None = None
 
         _scheme = url_parsed.scheme
         _provider = _scheme[0].upper() + _scheme[1:]
+        self._is_distributed = _provider not in ("", "Memory", "NoCache")
         _config_for_memory = {
             "cache": "aiocache.SimpleMemoryCache",
         }
@@ -50,9 +164,13 @@ class Caches(ABCCaches):
                 "port": url_parsed.port,
                 "db": url_parsed.path.strip("/"),
                 "password": url_parsed.password,
-                "serializer": {"class": "aiocache.serializers.PickleSerializer"},
+                "serializer": {
+                    "class": "infrastructure.serializers.VersionedSerializer",
+                    "models": models,
+                    "compress_threshold": compress_threshold,
+                },
             }
-            if _provider not in ("", "Memory", "NoCache")
+            if self._is_distributed
             else _config_for_memory
         )
         aiocache_caches.set_config({  # type: ignore
@@ -60,38 +178,363 @@ class Caches(ABCCaches):
             "distributed": _config_for_distributed,
         })
 
-        self._memory: BaseCache = aiocache_caches.get("default")  # type: ignore
+        self._memory = LRUMemoryCache(
+            max_entries=memory_max_entries, max_bytes=memory_max_bytes
+        )
         self._distributed: BaseCache = aiocache_caches.get("distributed")  # type: ignore
+        self._register_metrics(metrics)
+
+    def _register_metrics(self, metrics: Metrics) -> None:
+        self._lookups = metrics.counter(
+            "caches_lookups_total",
+            "Decorated calls by result: hit, stale, negative or miss",
+            ("function", "result"),
+        )
+        self._negative_sets = metrics.counter(
+            "caches_negative_sets_total", "Cached not found results", ("function",)
+        )
+        self._errors = metrics.counter(
+            "caches_errors_total",
+            "Failed cache reads and writes",
+            ("function", "tier", "operation"),
+        )
+        self._get_seconds = metrics.histogram(
+            "caches_get_seconds", "Cache read latency", ("function", "tier")
+        )
+        self._set_seconds = metrics.histogram(
+            "caches_set_seconds", "Cache write latency", ("function", "tier")
+        )
+        self._value_bytes = metrics.histogram(
+            "caches_value_bytes",
+            "Serialized size of the distributed entries",
+            ("function",),
+            buckets=SIZE_BUCKETS,
+        )
+        metrics.gauge(
+            "caches_memory_entries",
+            "Entries in the memory tier",
+            lambda: len(self._memory),
+        )
+        metrics.gauge(
+            "caches_memory_bytes",
+            "Approximate size of the memory tier",
+            lambda: self._memory.size,
+        )
 
     @property
     def lock(self) -> type[RedLock]:
-        return RedLock
+        return TryRedLock
 
     @cached_property
-    def memory(self) -> BaseCache:
+    def memory(self) -> LRUMemoryCache:
         return self._memory
 
     @cached_property
     def distributed(self) -> BaseCache:
         return self._distributed
 
-    def _decorator(self, func: _C[P, _A[T]], alias: str) -> _C[P, _G[Any, Any, T]]:
-        aiocache_func = aiocache_cached(  # type: ignore
-            alias=alias,
-            ttl=self._ttl,
-        )(func)
+    @property
+    def _has_pubsub(self) -> bool:
+        return self._is_distributed and hasattr(self._distributed, "client")
+
+    async def start(self) -> None:
+        if self._has_pubsub and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        for task in list(self._refreshes.values()):
+            task.cancel()
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        self._listener = None
+
+    async def _close_pubsub(self, pubsub: Any) -> None:
+        try:
+            await pubsub.unsubscribe()
+        except Exception as e:
+            self._logger.warning(f"Couldn't unsubscribe from invalidations: {e}")
+        finally:
+            # Returns the connection even if it is broken
+            await pubsub.aclose()
+
+    async def _receive(self, pubsub: Any) -> None:
+        await pubsub.subscribe(self._channel)
+        # Messages could be lost while disconnected
+        await self._memory.clear()
+        async for message in pubsub.listen():
+            if message["type"] != "message":
+                continue
+            data = message["data"]
+            if isinstance(data, bytes):
+                data = data.decode()
+            sender, _, key = data.partition(":")
+            if sender != self._id:
+                await self._memory.delete(key)
+
+    async def _listen(self) -> None:
+        """
+        Drops memory tier entries changed by other workers
+        """
+        while True:
+            try:
+                pubsub = self._distributed.client.pubsub()  # type: ignore
+                try:
+                    await self._receive(pubsub)
+                finally:
+                    await self._close_pubsub(pubsub)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._logger.error(f"Invalidation listener failed: {e}")
+                await asyncio.sleep(1)
+
+    async def _publish_invalidation(self, key: str) -> None:
+        if not self._has_pubsub:
+            return
+        try:
+            await self._distributed.client.publish(  # type: ignore
+                self._channel, f"{self._id}:{key}"
+            )
+        except Exception as e:
+            self._logger.error(f"Couldn't publish invalidation of {key}: {e}")
+
+    async def invalidate(self, key: str) -> None:
+        await self._memory.delete(key)
+        try:
+            await self._distributed.delete(key)  # type: ignore
+        except Exception as e:
+            self._logger.error(f"Couldn't delete {key}: {e}")
+        await self._publish_invalidation(key)
+
+    @staticmethod
+    def _build_key(func: _C[..., Any], args: Any, kwargs: dict[str, Any]) -> str:
+        # Same format as aiocache.cached to keep existing entries valid
+        ordered_kwargs = sorted(kwargs.items())
+        return (
+            (func.__module__ or "") + func.__name__ + str(args) + str(ordered_kwargs)
+        )
+
+    def _ttl_of(self, cache: Cache, stored: Any) -> int:
+        ttl = self._negative_ttl if isinstance(stored, NegativeEntry) else self._ttl
+        return min(ttl, self._memory_ttl) if cache is self._memory else ttl
+
+    def _tier_of(self, cache: Cache) -> str:
+        return "memory" if cache is self._memory else "distributed"
+
+    async def _get(self, cache: Cache, key: str, name: str) -> Any:
+        """
+        name: of the decorated function, for metrics
+        """
+        tier = self._tier_of(cache)
+        started = time.perf_counter()
+        try:
+            return await cache.get(key)  # type: ignore
+        except Exception as e:
+            self._errors.inc(name, tier, "get")
+            self._logger.error(f"Couldn't retrieve {key}: {e}")
+        finally:
+            self._get_seconds.observe(time.perf_counter() - started, name, tier)
+        return None
+
+    def _dumps(self, cache: BaseCache, name: str, value: Any) -> Any:
+        payload = cache.serializer.dumps(value)  # type: ignore
+        if isinstance(payload, (bytes, str)):
+            self._value_bytes.observe(len(payload), name)
+        return payload
+
+    async def _set(self, cache: Cache, key: str, value: Any, name: str) -> None:
+        tier = self._tier_of(cache)
+        kwargs: dict[str, Any] = {}
+        if isinstance(cache, BaseCache):
+            kwargs["dumps_fn"] = partial(self._dumps, cache, name)
+        started = time.perf_counter()
+        try:
+            await cache.set(  # type: ignore
+                key, value, ttl=self._ttl_of(cache, value), **kwargs
+            )
+        except Exception as e:
+            self._errors.inc(name, tier, "set")
+            self._logger.error(f"Couldn't set {key}: {e}")
+            return
+        finally:
+            self._set_seconds.observe(time.perf_counter() - started, name, tier)
+        if cache is self._distributed and self._has_pubsub:
+            await self._publish_invalidation(key)
+
+    def _wrap(self, value: Any) -> Any:
+        if not self._soft_ttl:
+            return value
+        return CacheEntry(value, time.time() + self._soft_ttl)
+
+    @staticmethod
+    def _unwrap(stored: Any) -> tuple[Any, float]:
+        """
+        Returns the value and the time it's fresh until,
+        raises the cached NotFoundError
+        """
+        if isinstance(stored, NegativeEntry):
+            raise NotFoundError(stored.message)
+        if isinstance(stored, CacheEntry):
+            return stored.value, stored.fresh_until
+        return stored, math.inf
+
+    async def _load(
+        self, tiers: Sequence[Cache], key: str, func: _C[[], _A[T]], name: str
+    ) -> T:
+        try:
+            value = await func()
+        except NotFoundError as e:
+            if self._negative_ttl:
+                self._negative_sets.inc(name)
+                for cache in reversed(tiers):
+                    await self._set(cache, key, NegativeEntry(str(e)), name)
+            raise
+        if value is not None:
+            stored = self._wrap(value)
+            for cache in reversed(tiers):
+                await self._set(cache, key, stored, name)
+        return value
+
+    def _is_shared(self, tiers: Sequence[Cache]) -> bool:
+        return tiers[-1] is self._distributed and self._is_distributed
+
+    async def _load_across_workers(
+        self, tiers: Sequence[Cache], key: str, func: _C[[], _A[T]], name: str
+    ) -> T:
+        cache = tiers[-1]
+        lock = TryRedLock(cache, key, self._lock_lease)
+        try:
+            is_owner = await lock.try_acquire()
+        except Exception as e:
+            self._logger.error(f"Couldn't lock {key}: {e}")
+            return await self._load(tiers, key, func, name)
+
+        if is_owner:
+            try:
+                return await self._load(tiers, key, func, name)
+            finally:
+                await lock.release()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._lock_lease
+        while loop.time() < deadline:
+            await asyncio.sleep(self._lock_poll_interval)
+            stored = await self._get(cache, key, name)
+            if stored is not None:
+                for upper in tiers[:-1]:
+                    await self._set(upper, key, stored, name)
+                return self._unwrap(stored)[0]
+            if not await cache.exists(f"{key}-lock"):  # type: ignore
+                break  # the owner has failed
+        return await self._load(tiers, key, func, name)
+
+    async def _revalidate(
+        self, tiers: Sequence[Cache], key: str, func: _C[[], _A[Any]], name: str
+    ) -> None:
+        lock: TryRedLock | None = None
+        if self._is_shared(tiers) and self._lock_lease:
+            lock = TryRedLock(tiers[-1], key, self._lock_lease)
+            try:
+                if not await lock.try_acquire():
+                    # Another worker is loading it. Stay in _refreshes for
+                    # the lease, so the next stale reads don't retry the lock
+                    await asyncio.sleep(self._lock_lease)
+                    return
+            except Exception as e:
+                self._logger.error(f"Couldn't lock {key}: {e}")
+                lock = None
+        try:
+            await self._load(tiers, key, func, name)
+        except Exception as e:
+            self._logger.error(f"Couldn't refresh {key}: {e}")
+        finally:
+            if lock is not None:
+                await lock.release()
+
+    def _refresh(
+        self, tiers: Sequence[Cache], key: str, func: _C[[], _A[Any]], name: str
+    ) -> None:
+        """
+        Reloads the key in the background, once at a time in the worker
+        """
+        if key in self._refreshes:
+            return
+        self._logger.debug(f"Refreshing {key}")
+        # Out of the caller context, so its deadline doesn't apply
+        task = asyncio.create_task(
+            self._revalidate(tiers, key, func, name), context=contextvars.Context()
+        )
+        self._refreshes[key] = task
+        task.add_done_callback(lambda _: self._refreshes.pop(key, None))
+
+    def _decorator(
+        self, func: _C[P, _A[T]], tiers: Sequence[Cache]
+    ) -> _C[P, _G[Any, Any, T]]:
+        """
+        tiers: from the fastest to the slowest
+        """
+        name = func.__qualname__
+        load = (
+            self._load_across_workers
+            if self._is_shared(tiers) and self._lock_lease
+            else self._load
+        )
 
         @wraps(func)
         async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-            return await aiocache_func(*args, **kwargs)  # type: ignore
+            key = self._build_key(func, args, kwargs)
+            for i, cache in enumerate(tiers):
+                stored = await self._get(cache, key, name)
+                if stored is None:
+                    continue
+                for upper in tiers[:i]:
+                    await self._set(upper, key, stored, name)
+                if isinstance(stored, NegativeEntry):
+                    self._lookups.inc(name, "negative")
+                value, fresh_until = self._unwrap(stored)
+                if time.time() >= fresh_until - self._refresh_ahead:
+                    self._lookups.inc(name, "stale")
+                    self._refresh(tiers, key, partial(func, *args, **kwargs), name)
+                else:
+                    self._lookups.inc(name, "hit")
+                return value
+            self._lookups.inc(name, "miss")
+            return await self._single_flight.do(
+                key, partial(load, tiers, key, partial(func, *args, **kwargs), name)
+            )
 
         return wrapper
 
     def distributed_decorator(self, func: _C[P, _A[T]]) -> _C[P, _G[Any, Any, T]]:
-        return self._decorator(func, "distributed")
+        return self._decorator(func, [self._distributed])
 
     def memory_decorator(self, func: _C[P, _A[T]]) -> _C[P, _G[Any, Any, T]]:
-        return self._decorator(func, "default")
+        return self._decorator(func, [self._memory])
+
+    def tiered_decorator(self, func: _C[P, _A[T]]) -> _C[P, _G[Any, Any, T]]:
+        return self._decorator(func, [self._memory, self._distributed])
+
+
+class CachesLifespan(ABCLifespan[None]):
+    def __init__(self, logging: Logging, caches: ABCCaches) -> None:
+        self._logger = logging.get_logger(__name__)
+        self._caches = caches
+
+    async def __aenter__(self) -> None:
+        await self._caches.start()
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: Any,
+    ) -> None:
+        await self._caches.close()
 
 
 # class NoCache(BaseCache):
@@ -0,0 +1,116 @@
+import time
+from enum import StrEnum
+from typing import Awaitable, Callable, Protocol, TypeVar
+
+from utils.exceptions import (AppError, DeadlineExceededError,
+                              ExternalServiceError, RateLimitError)
+from utils.logging import Logging
+
+T = TypeVar("T")
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class ABCCircuitBreaker(Protocol):
+    @property
+    def state(self) -> CircuitState:
+        raise NotImplementedError
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Call func or raise ExternalServiceError while the circuit is open
+        """
+        raise NotImplementedError
+
+
+class CircuitBreaker(ABCCircuitBreaker):
+    """
+    Per-worker circuit breaker. Failures are ExternalServiceError and
+    non-application exceptions; other AppError means the service is up.
+    Rate limit and deadline errors are neutral.
+    """
+
+    def __init__(
+        self,
+        logging: Logging,
+        name: str,
+        failure_threshold: int,
+        recovery_timeout: float,
+    ) -> None:
+        self._logger = logging.get_logger(__name__)
+        self._name = name
+        self._failure_threshold = failure_threshold
+        self._recovery_timeout = recovery_timeout
+
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._is_probing = False
+
+    @property
+    def state(self) -> CircuitState:
+        return self._state
+
+    def _set_state(self, state: CircuitState) -> None:
+        if state != self._state:
+            self._logger.warning(f"Circuit {self._name}: {self._state} -> {state}")
+            self._state = state
+
+    def _before_call(self) -> bool:
+        """
+        Returns True if the call is a probe of the half-open circuit
+        """
+        if self._state == CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self._recovery_timeout:
+                raise ExternalServiceError(f"{self._name} is unavailable")
+            self._set_state(CircuitState.HALF_OPEN)
+        if self._state == CircuitState.HALF_OPEN:
+            if self._is_probing:
+                raise ExternalServiceError(f"{self._name} is unavailable")
+            self._is_probing = True
+            return True
+        return False
+
+    def _on_success(self) -> None:
+        self._failures = 0
+        self._is_probing = False
+        self._set_state(CircuitState.CLOSED)
+
+    def _on_failure(self) -> None:
+        self._failures += 1
+        self._is_probing = False
+        if (
+            self._state == CircuitState.HALF_OPEN
+            or self._failures >= self._failure_threshold
+        ):
+            self._opened_at = time.monotonic()
+            self._set_state(CircuitState.OPEN)
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        is_probe = self._before_call()
+        try:
+            result = await func()
+        except (RateLimitError, DeadlineExceededError):
+            # Limited by the caller, not a sign of the service health
+            if is_probe:
+                self._is_probing = False
+            raise
+        except ExternalServiceError:
+            self._on_failure()
+            raise
+        except AppError:
+            self._on_success()
+            raise
+        except Exception:
+            self._on_failure()
+            raise
+        except BaseException:
+            if is_probe:
+                self._is_probing = False
+            raise
+        self._on_success()
+        return result
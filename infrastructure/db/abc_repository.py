@@ -4,19 +4,72 @@ T = TypeVar("T")
 
 
 class BaseRepository(Protocol[T]):
+    """
+    Lists are in id order, ids are UUIDv7 and sort by creation time.
+    after: id of the last object of the previous page. Pages are found by the
+    primary key index, so deep pages cost as much as the first one.
+    """
+
     async def create_obj(self, model: T) -> T:
         raise NotImplementedError
 
-    async def filter_by(self, model: type[T], **kwargs: Any) -> Sequence[T]:
+    async def filter_by(
+        self,
+        model: type[T],
+        after: Any | None = None,
+        limit: int | None = None,
+        **kwargs: Any,
+    ) -> Sequence[T]:
         raise NotImplementedError
 
-    async def search_by(self, model: type[T], **kwargs: Any) -> Sequence[T]:
+    async def search_rows(
+        self,
+        model: type[T],
+        columns: Sequence[Any],
+        *where: Any,
+        order_by: Sequence[Any] = (),
+        after: Any | None = None,
+        limit: int | None = None,
+        **kwargs: Any,
+    ) -> Sequence[Any]:
+        """
+        Rows of the columns, no objects are loaded. Substring match of string
+        kwargs, equality of the others.
+        where: extra conditions of the backend
+        order_by: sorts before the id
+        """
         raise NotImplementedError
 
     async def get_by_id(self, model: type[T], id_: Any) -> T:
         raise NotImplementedError
 
-    async def get_all(self, model: type[T]) -> Sequence[T]:
+    async def insert_many(
+        self, model: type[T], values: Sequence[dict[str, Any]]
+    ) -> None:
+        raise NotImplementedError
+
+    async def upsert(
+        self,
+        model: type[T],
+        values: Sequence[dict[str, Any]],
+        index_elements: Sequence[str],
+        update: Sequence[str],
+    ) -> Sequence[Any]:
+        """
+        Insert or update on conflict in one statement.
+        Returns (id, *index_elements, inserted) rows.
+        """
+        raise NotImplementedError
+
+    async def get_version(self, model: type[T], id_: Any) -> Any:
+        """
+        Last update time of the object without loading it
+        """
+        raise NotImplementedError
+
+    async def get_all(
+        self, model: type[T], after: Any | None = None, limit: int | None = None
+    ) -> Sequence[T]:
         raise NotImplementedError
 
     async def update_obj(self, model: type[T], id_: Any, **kwargs: Any) -> None:
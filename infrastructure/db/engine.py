@@ -7,3 +7,17 @@ class ABCDatabaseEngine(Protocol):
 
     def get_engine(self) -> object:
         raise NotImplementedError
+
+    def get_read_engine(self) -> object:
+        """
+        Engine for read-only work: a replica, or the primary if there are no
+        healthy replicas or the current client wrote recently
+        """
+        raise NotImplementedError
+
+    def mark_written(self) -> None:
+        """
+        Pins reads of the current client to the primary for the
+        read-your-writes window
+        """
+        raise NotImplementedError
@@ -3,7 +3,8 @@ from datetime import datetime
 from fastapi_users.db import SQLAlchemyBaseUserTableUUID
 from fastapi_users_db_sqlalchemy import UUID_ID
 from fastapi_users_db_sqlalchemy.generics import GUID
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import ForeignKey, Index, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import DeclarativeBase, mapped_column, relationship
 from sqlalchemy.orm.base import Mapped
 from sqlalchemy.sql.sqltypes import TIMESTAMP
@@ -31,29 +32,53 @@ class User(SQLAlchemyBaseUserTableUUID, Base):
     membership_date: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
 
 
+def trigram_index(table: str, column: str) -> Index:
+    """
+    Serves ILIKE '%value%' searches, needs the pg_trgm extension
+    """
+    return Index(
+        f"ix_{table}_{column}_trgm",
+        column,
+        postgresql_using="gin",
+        postgresql_ops={column: "gin_trgm_ops"},
+    )
+
+
 class Book(Base):
     __tablename__ = "books"
+    __table_args__ = (
+        trigram_index("books", "title"),
+        trigram_index("books", "isbn"),
+        trigram_index("books", "category"),
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[UUID_ID] = mapped_column(GUID, primary_key=True, default=UUID.generate)
-    isbn: Mapped[str] = mapped_column()
+    isbn: Mapped[str] = mapped_column(unique=True)
     title: Mapped[str] = mapped_column()
     category: Mapped[str] = mapped_column()
     language: Mapped[str] = mapped_column()
     pub_date: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
+    # Weighted title, authors and category, maintained by database triggers
+    search_vector: Mapped[str | None] = mapped_column(TSVECTOR, deferred=True)
 
+    # Reads go through BookRepository projections, lazy loads would be hidden
+    # queries (and fail under asyncio)
     authors: Mapped[list["Author"]] = relationship(
-        secondary="authors_books", back_populates="books", lazy="selectin"
+        secondary="authors_books", back_populates="books", lazy="raise"
     )
 
 
 class Author(Base):
     __tablename__ = "authors"
+    __table_args__ = (trigram_index("authors", "name_key"),)
 
     id: Mapped[UUID_ID] = mapped_column(GUID, primary_key=True, default=UUID.generate)
     name: Mapped[str] = mapped_column()
+    name_key: Mapped[str] = mapped_column(unique=True)  # Normalization.author
 
     books: Mapped[list["Book"]] = relationship(
-        secondary="authors_books", back_populates="authors", lazy="selectin"
+        secondary="authors_books", back_populates="authors", lazy="raise"
     )
 
 
@@ -67,4 +92,5 @@ class AuthorsBooks(Base):
     book_id: Mapped[UUID_ID] = mapped_column(
         ForeignKey("books.id", ondelete="CASCADE"),
         primary_key=True,
+        index=True,
     )
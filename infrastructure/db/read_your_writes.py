@@ -0,0 +1,45 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+
+class ReadYourWrites:
+    """
+    Last write time of the current client, visible everywhere down the call
+    stack. The client carries it between requests, which can land on any
+    worker. Mutable, so writes of child tasks are seen by the request.
+    """
+
+    _ctx_client: ContextVar["ReadYourWrites | None"] = ContextVar(
+        "read_your_writes", default=None
+    )
+
+    def __init__(self, written_at: float | None) -> None:
+        self.written_at = written_at  # Unix time, comparable between hosts
+
+    @classmethod
+    @contextmanager
+    def start(cls, written_at: float | None) -> Iterator["ReadYourWrites"]:
+        client = cls(written_at)
+        token = cls._ctx_client.set(client)
+        try:
+            yield client
+        finally:
+            cls._ctx_client.reset(token)
+
+    @classmethod
+    def mark_written(cls) -> None:
+        """
+        Outside of a client's request, e.g. during warm-up, nothing is pinned
+        """
+        if (client := cls._ctx_client.get()) is not None:
+            client.written_at = time.time()
+
+    @classmethod
+    def written_within(cls, window: float) -> bool:
+        client = cls._ctx_client.get()
+        if client is None or client.written_at is None:
+            return False
+        # A time in the future can only come from a forged value
+        return 0 <= time.time() - client.written_at < window
@@ -1,40 +1,367 @@
-from typing import Any, Sequence
+from datetime import datetime, timezone
+from typing import Any, Iterable, Sequence
 from uuid import UUID
 
-from core.models.book import Book
+from sqlalchemy import cast, func, select
+from sqlalchemy.dialects.postgresql import REGCONFIG, aggregate_order_by
+
+from core.models.book import Book, StoredAuthor, StoredBook
 from infrastructure.db.abc_repository import BaseRepository
+from infrastructure.db.exceptions import exc
 from infrastructure.db.models.models import Author as AuthorModel
+from infrastructure.db.models.models import AuthorsBooks
 from infrastructure.db.models.models import Book as BookModel
 from infrastructure.db.session_manager import ABCSessionManager
+from infrastructure import uuid as uuid_generator
+from utils.exceptions import ExternalValueError
 from utils.logging import Logging
+from utils.normalization import Normalization
 
 
 class BookRepository:
+    TEXT_SEARCH_CONFIG = "english"  # same as the books_search_vector() function
+    COLUMNS = (
+        BookModel.id,
+        BookModel.isbn,
+        BookModel.title,
+        BookModel.category,
+        BookModel.language,
+        BookModel.pub_date,
+        BookModel.created_at,
+        BookModel.updated_at,
+    )  # of StoredBook
+
     def __init__(
         self,
         logging: Logging,
         repository: BaseRepository,  # type: ignore - hack for DI
+        author_repository: BaseRepository,  # type: ignore - hack for DI
         session_manager: ABCSessionManager,
     ) -> None:
         self._logger = logging.get_logger(__name__)
         self._repository: BaseRepository[BookModel] = repository
+        self._author_repository: BaseRepository[AuthorModel] = author_repository
         self._session_manager = session_manager
 
-    async def create_book(self, book: Book) -> BookModel:
-        book_model = BookModel(
-            **book.dict(exclude={"authors"}),
-            authors=[
-                await self._repository.create_obj(AuthorModel(name=author.name))  # type: ignore
-                for author in book.authors
+    @staticmethod
+    def _isbn(value: str) -> str:
+        try:
+            return Normalization.isbn(value)
+        except ExternalValueError:
+            return value.strip()
+
+    @staticmethod
+    def _pub_date(value: datetime) -> datetime:
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
+    async def _with_authors(self, rows: Sequence[Any]) -> list[StoredBook]:
+        """
+        Books of the projected rows with their authors, aggregated per book in
+        one query. Nothing is loaded into the session.
+        """
+        if not rows:
+            return []
+        session = self._session_manager.session()
+        # Both arrays in the same total order, so their elements pair up
+        order_by = (AuthorModel.name, AuthorModel.id)
+        query = (
+            select(
+                AuthorsBooks.book_id,
+                func.array_agg(aggregate_order_by(AuthorModel.id, *order_by)),
+                func.array_agg(aggregate_order_by(AuthorModel.name, *order_by)),
+            )
+            .join(AuthorModel, AuthorModel.id == AuthorsBooks.author_id)
+            .where(AuthorsBooks.book_id.in_([row.id for row in rows]))
+            .group_by(AuthorsBooks.book_id)
+        )
+        authors = {
+            book_id: [
+                StoredAuthor.model_construct(id=author_id, name=name)
+                for author_id, name in zip(author_ids, names, strict=True)
+            ]
+            for book_id, author_ids, names in await session.execute(query)
+        }
+        # Built without validation, the values come from the database
+        return [
+            StoredBook.model_construct(**row._mapping, authors=authors.get(row.id, []))
+            for row in rows
+        ]
+
+    async def create_book(self, book: Book) -> StoredBook:
+        return (await self.upsert_books([book]))[0]
+
+    async def get_book_by_id(self, id_: UUID) -> StoredBook:
+        rows = await self._repository.search_rows(
+            BookModel, self.COLUMNS, BookModel.id == id_
+        )
+        if not rows:
+            raise exc.NoResultFound("No row was found when one was required")
+        return (await self._with_authors(rows))[0]
+
+    async def get_book_version(self, id_: UUID) -> datetime:
+        return await self._repository.get_version(BookModel, id_)
+
+    def _text_query(self, text: str) -> Any:
+        return func.websearch_to_tsquery(
+            cast(self.TEXT_SEARCH_CONFIG, REGCONFIG), text
+        )
+
+    def _conditions(self, text: str | None, author: str | None) -> list[Any]:
+        conditions: list[Any] = []
+        if text is not None:
+            conditions.append(BookModel.search_vector.op("@@")(self._text_query(text)))
+        if author is not None:
+            # EXISTS over authors_books and authors, the books aren't multiplied
+            # and no authors are loaded. Served by the name_key trigram index.
+            conditions.append(
+                BookModel.authors.any(
+                    AuthorModel.name_key.contains(
+                        Normalization.author(author), autoescape=True
+                    )
+                )
+            )
+        return conditions
+
+    async def filter_by(
+        self, after: UUID | None = None, limit: int | None = None, **kwargs: Any
+    ) -> list[StoredBook]:
+        """
+        category: compared case-insensitively, it's stored as the source sent it
+        """
+        rows = await self._repository.search_rows(
+            BookModel,
+            self.COLUMNS,
+            *(
+                func.lower(BookModel.category) == func.lower(value)
+                if key == "category"
+                else getattr(BookModel, key) == value
+                for key, value in kwargs.items()
+            ),
+            after=after,
+            limit=limit,
+        )
+        return await self._with_authors(rows)
+
+    async def search(
+        self,
+        text: str | None = None,
+        author: str | None = None,
+        after: UUID | None = None,
+        limit: int | None = None,
+        **kwargs: Any,
+    ) -> list[StoredBook]:
+        """
+        text: web search syntax query on titles, authors and categories, the
+        books are ranked by relevance. Served by the search_vector GIN index.
+        author: substring of any author name
+        after: id of the last book of the previous page, only without text
+        """
+        order_by: list[Any] = []
+        if text is not None:
+            if after is not None:
+                raise ExternalValueError("Full-text search results aren't paged")
+            order_by = [
+                func.ts_rank(BookModel.search_vector, self._text_query(text)).desc()
+            ]
+        rows = await self._repository.search_rows(
+            BookModel,
+            self.COLUMNS,
+            *self._conditions(text, author),
+            order_by=order_by,
+            after=after,
+            limit=limit,
+            **kwargs,
+        )
+        return await self._with_authors(rows)
+
+    async def recent_isbns(self, limit: int) -> Sequence[str]:
+        """
+        ISBNs of the last fetched books
+        """
+        session = self._session_manager.session()
+        query = (
+            select(BookModel.isbn)
+            .group_by(BookModel.isbn)
+            .order_by(func.max(BookModel.created_at).desc())
+            .limit(limit)
+        )
+        return (await session.execute(query)).scalars().all()
+
+    async def top_categories(self, limit: int) -> Sequence[str]:
+        """
+        Categories with the most books
+        """
+        session = self._session_manager.session()
+        query = (
+            select(BookModel.category)
+            .group_by(BookModel.category)
+            .order_by(func.count().desc())
+            .limit(limit)
+        )
+        return (await session.execute(query)).scalars().all()
+
+    async def upsert_books(self, books: Sequence[Book]) -> list[StoredBook]:
+        """
+        Insert new books and update existing ones by ISBN in a constant number
+        of statements. Authors are only added to new books.
+        Returns the books in the input order.
+        """
+        if not books:
+            return []
+        by_isbn = {self._isbn(book.isbn): book for book in books}
+        # Sorted to lock conflicting rows in the same order in every transaction
+        by_isbn = dict(sorted(by_isbn.items()))
+        rows = await self._repository.upsert(
+            BookModel,
+            [
+                {
+                    "id": uuid_generator.UUID.generate(),
+                    "isbn": isbn,
+                    "title": book.title,
+                    "category": book.category,
+                    "language": book.language,
+                    "pub_date": self._pub_date(book.pub_date),
+                }
+                for isbn, book in by_isbn.items()
             ],
+            index_elements=["isbn"],
+            update=["title", "category", "language", "pub_date"],
         )
-        return await self._repository.create_obj(book_model)
 
-    async def get_book_by_id(self, id_: UUID) -> BookModel:
-        return await self._repository.get_by_id(BookModel, id_)
+        inserted_books = [
+            (book_id, by_isbn[isbn]) for book_id, isbn, inserted in rows if inserted
+        ]
+        author_ids = await self.get_or_create_authors(
+            author.name for _, book in inserted_books for author in book.authors
+        )
+        links = {
+            (author_ids[Normalization.author(author.name)], book_id)
+            for book_id, book in inserted_books
+            for author in book.authors
+        }
+        await self._repository.insert_many(
+            AuthorsBooks,  # type: ignore
+            [
+                {"author_id": author_id, "book_id": book_id}
+                for author_id, book_id in links
+            ],
+        )
 
-    async def filter_by(self, **kwargs: Any) -> Sequence[BookModel]:
-        return await self._repository.filter_by(BookModel, **kwargs)
+        stored = {
+            book.id: book
+            for book in await self._with_authors(
+                await self._repository.search_rows(
+                    BookModel,
+                    self.COLUMNS,
+                    BookModel.id.in_([book_id for book_id, _, _ in rows]),
+                )
+            )
+        }
+        ids = {isbn: book_id for book_id, isbn, _ in rows}
+        return [stored[ids[self._isbn(book.isbn)]] for book in books]
+
+    async def get_or_create_authors(self, names: Iterable[str]) -> dict[str, UUID]:
+        """
+        Resolves authors by Normalization.author key in one statement,
+        the first spelling of a name is kept. Returns ids by keys.
+        """
+        by_key: dict[str, str] = {}
+        for name in names:
+            by_key.setdefault(Normalization.author(name), name)
+        rows = await self._author_repository.upsert(
+            AuthorModel,
+            [
+                {"id": uuid_generator.UUID.generate(), "name": name, "name_key": key}
+                for key, name in sorted(by_key.items())
+            ],
+            index_elements=["name_key"],
+            update=["name_key"],  # no-op, makes existing rows returned
+        )
+        return {key: author_id for author_id, key, _ in rows}
+
+    async def import_books(self, books: Sequence[Book]) -> int:
+        """
+        Bulk load through COPY into staging tables and merge them in a few
+        statements. Books existing with the same ISBN are skipped.
+        Postgres (asyncpg) only. Returns the number of inserted books.
+        """
+        book_records: list[tuple[Any, ...]] = []
+        author_records: list[tuple[Any, ...]] = []
+        for book in books:
+            book_id = uuid_generator.UUID.generate()
+            book_records.append(
+                (
+                    book_id,
+                    self._isbn(book.isbn),
+                    book.title,
+                    book.category,
+                    book.language,
+                    self._pub_date(book.pub_date),
+                )
+            )
+            author_records.extend(
+                (
+                    uuid_generator.UUID.generate(),
+                    book_id,
+                    author.name,
+                    Normalization.author(author.name),
+                )
+                for author in book.authors
+            )
 
-    async def search(self, **kwargs: Any) -> Sequence[BookModel]:
-        return await self._repository.search_by(BookModel, **kwargs)
+        session = self._session_manager.session()
+        connection = await (await session.connection()).get_raw_connection()
+        driver = connection.driver_connection  # asyncpg.Connection
+        assert driver is not None, "the connection was just checked out"
+        # SQLAlchemy begins the transaction lazily, it is a savepoint if begun
+        async with driver.transaction():  # type: ignore
+            await driver.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS import_books (
+                    id uuid, isbn text, title text, category text,
+                    language text, pub_date timestamptz
+                ) ON COMMIT DROP;
+                CREATE TEMP TABLE IF NOT EXISTS import_authors (
+                    id uuid, book_id uuid, name text, name_key text
+                ) ON COMMIT DROP;
+                TRUNCATE import_books, import_authors;
+            """)  # type: ignore
+            await driver.copy_records_to_table(  # type: ignore
+                "import_books",
+                records=book_records,
+                columns=("id", "isbn", "title", "category", "language", "pub_date"),
+            )
+            await driver.copy_records_to_table(  # type: ignore
+                "import_authors",
+                records=author_records,
+                columns=("id", "book_id", "name", "name_key"),
+            )
+            inserted = await driver.fetchval("""
+                WITH inserted AS (
+                    INSERT INTO books
+                        (id, isbn, title, category, language, pub_date)
+                    SELECT DISTINCT ON (s.isbn)
+                        s.id, s.isbn, s.title, s.category, s.language, s.pub_date
+                    FROM import_books s
+                    ORDER BY s.isbn, s.id
+                    ON CONFLICT (isbn) DO NOTHING
+                    RETURNING id
+                )
+                SELECT count(*) FROM inserted
+            """)  # type: ignore
+            # Only authors of inserted books have their book ids in the table
+            await driver.execute("""
+                INSERT INTO authors (id, name, name_key)
+                SELECT DISTINCT ON (a.name_key) a.id, a.name, a.name_key
+                FROM import_authors a JOIN books b ON b.id = a.book_id
+                ORDER BY a.name_key, a.id
+                ON CONFLICT (name_key) DO NOTHING;
+                INSERT INTO authors_books (author_id, book_id)
+                SELECT DISTINCT au.id, a.book_id
+                FROM import_authors a
+                JOIN books b ON b.id = a.book_id
+                JOIN authors au ON au.name_key = a.name_key
+                ON CONFLICT DO NOTHING;
+            """)  # type: ignore
+        return inserted  # type: ignore
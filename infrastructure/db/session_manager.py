@@ -1,6 +1,6 @@
-from contextlib import asynccontextmanager
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
 from contextvars import ContextVar
-from typing import Protocol
+from typing import AsyncGenerator, Protocol
 
 from sqlalchemy.ext.asyncio.session import AsyncSession
 
@@ -9,8 +9,13 @@ from utils.logging import Logging
 
 
 class ABCSessionManager(Protocol):
-    @asynccontextmanager  # type: ignore
-    async def make_session(self) -> AsyncSession:
+    def make_session(
+        self, read_only: bool = False
+    ) -> AbstractAsyncContextManager[AsyncSession]:
+        """
+        read_only: runs on a replica unless the client wrote recently,
+        nothing is committed
+        """
         raise NotImplementedError
 
     def session(self) -> AsyncSession:
@@ -27,8 +32,10 @@ class SessionManager(ABCSessionManager):
         self._logger = logging.get_logger(__name__)
 
     @asynccontextmanager
-    async def make_session(self):
-        async with self._uow as session:
+    async def make_session(
+        self, read_only: bool = False
+    ) -> AsyncGenerator[AsyncSession, None]:
+        async with self._uow.read_only() if read_only else self._uow as session:
             token = self._ctx_session.set(session)
             try:
                 yield session
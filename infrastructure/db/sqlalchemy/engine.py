@@ -1,11 +1,162 @@
+import time
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio.engine import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from infrastructure.db.engine import ABCDatabaseEngine
+from infrastructure.db.read_your_writes import ReadYourWrites
+from infrastructure.metrics import Metrics
+from utils.logging import Logging
 
 
 class SQLAlchemyEngine(ABCDatabaseEngine):
-    def __init__(self, url: str) -> None:
-        self._db_engine = create_async_engine(url)
+    def __init__(
+        self,
+        logging: Logging,
+        metrics: Metrics,
+        url: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30.0,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        statement_cache_size: int = 100,
+        pgbouncer: bool = False,
+        replica_urls: list[str] | None = None,
+        read_your_writes: float = 2.0,
+        replica_cooldown: float = 30.0,
+        replica_connect_timeout: float = 1.0,
+    ) -> None:
+        """
+        pool_size: connections kept open, max_overflow more are opened under load
+        pool_timeout: seconds to wait for a connection before failing
+        pool_recycle: seconds after which connections are reopened, -1 never
+        pool_pre_ping: test connections on checkout to survive server restarts
+        statement_cache_size: prepared statements per connection, 0 disables
+        pgbouncer: PgBouncer transaction pooling mode, server connections change
+            between transactions so prepared statements aren't cached or reused
+        replica_urls: read-only sessions are spread over them round-robin
+        read_your_writes: seconds reads of a client stay on the primary after
+            its write, should cover the replication lag
+        replica_cooldown: seconds a replica is skipped after failing to connect
+        replica_connect_timeout: seconds to connect to a replica before falling
+            back to the primary, asyncpg waits 60 by default
+        """
+        self._logger = logging.get_logger(__name__)
+        connect_args: dict[str, Any] = {
+            "prepared_statement_cache_size": statement_cache_size,  # SQLAlchemy
+            "statement_cache_size": statement_cache_size,  # raw asyncpg queries
+        }
+        if pgbouncer:
+            connect_args = {
+                "prepared_statement_cache_size": 0,
+                "statement_cache_size": 0,
+                # Names of other clients' statements may exist on the connection
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+        options: dict[str, Any] = {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+            "pool_pre_ping": pool_pre_ping,
+            "connect_args": connect_args,
+        }
+        self._register_metrics(metrics)
+        self._db_engine = create_async_engine(
+            url, poolclass=self._measured_pool(), **options
+        )
+        replica_options = {
+            **options,
+            "connect_args": {**connect_args, "timeout": replica_connect_timeout},
+        }
+        self._replicas = [
+            create_async_engine(
+                replica_url, poolclass=self._measured_pool(index), **replica_options
+            )
+            for index, replica_url in enumerate(replica_urls or [])
+        ]
+        self._read_your_writes = read_your_writes
+        self._replica_cooldown = replica_cooldown
+        self._down_until = [0.0] * len(self._replicas)
+        self._next_replica = 0
+
+    def _register_metrics(self, metrics: Metrics) -> None:
+        def pool() -> AsyncAdaptedQueuePool:
+            return self._db_engine.sync_engine.pool  # type: ignore
+
+        metrics.gauge("db_pool_size", "Connections kept open", lambda: pool().size())
+        metrics.gauge(
+            "db_pool_checked_out",
+            "Connections in use",
+            lambda: pool().checkedout(),
+        )
+        metrics.gauge(
+            "db_pool_overflow",
+            "Connections open above the pool size",
+            lambda: max(pool().overflow(), 0),
+        )
+        self._wait_seconds = metrics.histogram(
+            "db_pool_wait_seconds",
+            "Time to get a connection from the pool, including opening it",
+        )
+        self._timeouts = metrics.counter(
+            "db_pool_timeouts_total", "Connections not available in the pool timeout"
+        )
+        self._read_sessions = metrics.counter(
+            "db_read_sessions_total",
+            "Read-only sessions by engine: primary or replica index",
+            ("engine",),
+        )
+
+    def _measured_pool(self, replica: int | None = None) -> type[AsyncAdaptedQueuePool]:
+        engine = self
+
+        class MeasuredPool(AsyncAdaptedQueuePool):
+            def connect(self) -> Any:
+                started = time.perf_counter()
+                try:
+                    return super().connect()
+                except exc.TimeoutError:
+                    engine._timeouts.inc()
+                    engine._logger.warning(
+                        f"Database pool is exhausted: {self.checkedout()} connections"
+                        f" checked out, {max(self.overflow(), 0)} in overflow"
+                    )
+                    raise
+                except Exception as e:
+                    if replica is not None:
+                        engine._mark_down(replica, e)
+                    raise
+                finally:
+                    engine._wait_seconds.observe(time.perf_counter() - started)
+
+        return MeasuredPool
+
+    def _mark_down(self, replica: int, error: Exception) -> None:
+        self._logger.warning(
+            f"Replica {replica} is skipped for {self._replica_cooldown}s,"
+            f" couldn't connect: {type(error).__name__}: {error}"
+        )
+        self._down_until[replica] = time.monotonic() + self._replica_cooldown
 
     def get_engine(self) -> AsyncEngine:
         return self._db_engine
+
+    def get_read_engine(self) -> AsyncEngine:
+        now = time.monotonic()
+        if self._replicas and not ReadYourWrites.written_within(self._read_your_writes):
+            for _ in range(len(self._replicas)):
+                index = self._next_replica
+                self._next_replica = (index + 1) % len(self._replicas)
+                if self._down_until[index] <= now:
+                    self._read_sessions.inc(str(index))
+                    return self._replicas[index]
+        self._read_sessions.inc("primary")
+        return self._db_engine
+
+    def mark_written(self) -> None:
+        ReadYourWrites.mark_written()
@@ -1,6 +1,8 @@
 from typing import Any, Sequence, TypeVar
 
-from sqlalchemy import delete, select, update
+from sqlalchemy import (Select, case, delete, func, insert, literal_column,
+                        select, tuple_, update)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import DeclarativeBase
 
 from infrastructure.db.abc_repository import BaseRepository
@@ -22,32 +24,135 @@ class SQLAlchemyRepository(BaseRepository[Model]):
         await session.refresh(model)
         return model
 
-    async def filter_by(self, model: type[Model], **kwargs: Any) -> Sequence[Model]:
+    @staticmethod
+    def _page(
+        query: Select[Any],
+        model: type[Model],
+        after: Any | None,
+        limit: int | None,
+        order_by: Sequence[Any] = (),
+    ) -> Select[Any]:
+        """
+        Keyset page: WHERE id > after ORDER BY id LIMIT, never OFFSET
+        """
+        if after is not None:
+            query = query.where(model.id > after)  # type: ignore
+        return query.order_by(*order_by, model.id).limit(limit)  # type: ignore
+
+    async def filter_by(
+        self,
+        model: type[Model],
+        after: Any | None = None,
+        limit: int | None = None,
+        **kwargs: Any,
+    ) -> Sequence[Model]:
         session = self._session_manager.session()
-        query = select(model).filter_by(**kwargs)
+        query = self._page(select(model).filter_by(**kwargs), model, after, limit)
         return (await session.execute(query)).scalars().all()
 
-    async def search_by(self, model: type[Model], **kwargs: Any) -> Sequence[Model]:
-        session = self._session_manager.session()
-        query = select(model)
+    @staticmethod
+    def _contains(value: str) -> str:
+        """
+        ILIKE pattern matching the value anywhere. Wildcards of the value are
+        escaped: a "%" would match every row and bypass the trigram indexes.
+        """
+        for char in ("\\", "%", "_"):
+            value = value.replace(char, f"\\{char}")
+        return f"%{value}%"
+
+    @classmethod
+    def _search(
+        cls, query: Select[Any], model: type[Model], **kwargs: Any
+    ) -> Select[Any]:
+        """
+        Strings are matched with ILIKE on the bare column, which the trigram
+        indexes can serve. Wrapping the column (lower(), casts) would not.
+        """
         for key, value in kwargs.items():
             if value is None:
                 continue
+            column = getattr(model, key)
             query = (
-                query.where(getattr(model, key).ilike(f"%{value}%"))
+                query.where(column.ilike(cls._contains(value), escape="\\"))
                 if isinstance(value, str)
-                else query.where(getattr(model, key) == value)
+                else query.where(column == value)
             )
-        return (await session.execute(query)).scalars().all()
+        return query
+
+    async def search_rows(
+        self,
+        model: type[Model],
+        columns: Sequence[Any],
+        *where: Any,
+        order_by: Sequence[Any] = (),
+        after: Any | None = None,
+        limit: int | None = None,
+        **kwargs: Any,
+    ) -> Sequence[Any]:
+        session = self._session_manager.session()
+        query = self._page(
+            self._search(select(*columns), model, **kwargs).where(*where),
+            model,
+            after,
+            limit,
+            order_by,
+        )
+        return (await session.execute(query)).all()
 
     async def get_by_id(self, model: type[Model], id_: Any) -> Model:
         session = self._session_manager.session()
         query = select(model).where(model.id == id_)  # type: ignore
         return (await session.execute(query)).scalar_one()  # type: ignore
 
-    async def get_all(self, model: type[Model]) -> Sequence[Model]:
+    async def insert_many(
+        self, model: type[Model], values: Sequence[dict[str, Any]]
+    ) -> None:
+        if not values:
+            return
+        session = self._session_manager.session()
+        await session.execute(insert(model), list(values))
+
+    async def upsert(
+        self,
+        model: type[Model],
+        values: Sequence[dict[str, Any]],
+        index_elements: Sequence[str],
+        update: Sequence[str],
+    ) -> Sequence[Any]:
+        """
+        Postgres only. updated_at is only bumped if an updated column changes.
+        """
+        if not values:
+            return []
+        session = self._session_manager.session()
+        table = model.__table__  # type: ignore
+        query = pg_insert(model).values(list(values))
+        is_changed = tuple_(*(table.c[name] for name in update)).is_distinct_from(
+            tuple_(*(query.excluded[name] for name in update))
+        )
+        query = query.on_conflict_do_update(
+            index_elements=list(index_elements),
+            set_={
+                **{name: query.excluded[name] for name in update},
+                "updated_at": case((is_changed, func.now()), else_=table.c.updated_at),
+            },
+        ).returning(
+            table.c.id,
+            *(table.c[name] for name in index_elements),
+            literal_column("xmax = 0").label("inserted"),
+        )
+        return (await session.execute(query)).all()
+
+    async def get_version(self, model: type[Model], id_: Any) -> Any:
+        session = self._session_manager.session()
+        query = select(model.updated_at).where(model.id == id_)  # type: ignore
+        return (await session.execute(query)).scalar_one()
+
+    async def get_all(
+        self, model: type[Model], after: Any | None = None, limit: int | None = None
+    ) -> Sequence[Model]:
         session = self._session_manager.session()
-        result = await session.execute(select(model))
+        result = await session.execute(self._page(select(model), model, after, limit))
         return result.scalars().all()
 
     async def update_obj(self, model: type[Model], id_: Any, **kwargs: Any) -> None:
@@ -1,15 +1,45 @@
 import asyncio
-from contextlib import AbstractAsyncContextManager
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from typing import Any, AsyncIterator
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import async_scoped_session, async_sessionmaker
 from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session
 
 from infrastructure.db.engine import ABCDatabaseEngine
 from utils.logging import Logging
 
 
 class ABCUnitOfWork(AbstractAsyncContextManager[AsyncSession]):
-    ...
+    def read_only(self) -> AbstractAsyncContextManager[AsyncSession]:
+        """
+        Unit of work on a replica, nothing is committed
+        """
+        raise NotImplementedError
+
+
+class RoutingSession(Session):
+    """
+    Executes on the read engine of a read-only unit of work, on the primary
+    otherwise. Remembers whether anything was written.
+    """
+
+    def get_bind(self, mapper: Any = None, **kwargs: Any) -> Any:
+        if (engine := self.info.get("read_engine")) is not None:
+            return engine
+        return super().get_bind(mapper, **kwargs)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _on_execute(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["written"] = True
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _on_flush(session: Session, _: Any) -> None:
+    session.info["written"] = True
 
 
 class SQLAlchemyUnitOfWork(ABCUnitOfWork):
@@ -17,12 +47,16 @@ class SQLAlchemyUnitOfWork(ABCUnitOfWork):
         self._logger = logging.get_logger(__name__)
         self._db_engine = db_engine
         self._session_maker = async_scoped_session(
-            async_sessionmaker(bind=db_engine.get_engine()),  # type: ignore
+            async_sessionmaker(
+                bind=db_engine.get_engine(),  # type: ignore
+                sync_session_class=RoutingSession,
+            ),
             scopefunc=asyncio.current_task,
         )
 
     async def __aenter__(self):
         self.session = self._session_maker()
+        self.session.info.pop("written", None)
         return self.session
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -31,4 +65,29 @@ class SQLAlchemyUnitOfWork(ABCUnitOfWork):
             await self.session.rollback()
         else:
             await self.session.commit()
+            if self.session.info.pop("written", False):
+                self._db_engine.mark_written()
         await asyncio.shield(self.session.close())
+
+    @asynccontextmanager
+    async def read_only(self) -> AsyncIterator[AsyncSession]:
+        session = self._session_maker()
+        engine = self._db_engine.get_read_engine()
+        session.info["read_engine"] = engine.sync_engine  # type: ignore
+        if engine is not self._db_engine.get_engine():
+            try:
+                # Connect now to fall back to the primary if the replica is down
+                await session.connection()
+            except Exception as e:
+                self._logger.warning(
+                    f"Reading from the primary, replica failed: {type(e).__name__}: {e}"
+                )
+                await session.rollback()
+                session.info.pop("read_engine")
+        try:
+            yield session
+        finally:
+            session.info.pop("read_engine", None)
+            session.expunge_all()
+            await session.rollback()
+            await asyncio.shield(session.close())
@@ -0,0 +1,55 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Iterator, TypeVar
+
+from utils.exceptions import DeadlineExceededError
+
+T = TypeVar("T")
+
+
+class Deadline:
+    """
+    Time budget of the current request, visible everywhere down the call stack
+    """
+
+    _ctx_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+    @staticmethod
+    def _now() -> float:
+        return asyncio.get_running_loop().time()
+
+    @classmethod
+    @contextmanager
+    def start(cls, timeout: float) -> Iterator[None]:
+        """
+        Nested deadlines can only shorten the current one
+        """
+        deadline = cls._now() + timeout
+        current = cls._ctx_deadline.get()
+        if current is not None:
+            deadline = min(deadline, current)
+        token = cls._ctx_deadline.set(deadline)
+        try:
+            yield
+        finally:
+            cls._ctx_deadline.reset(token)
+
+    @classmethod
+    def remaining(cls) -> float | None:
+        deadline = cls._ctx_deadline.get()
+        return None if deadline is None else deadline - cls._now()
+
+    @classmethod
+    def check(cls) -> float | None:
+        remaining = cls.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError("Request deadline is exceeded")
+        return remaining
+
+    @classmethod
+    async def wait_for(cls, awaitable: Awaitable[T]) -> T:
+        try:
+            return await asyncio.wait_for(awaitable, cls.check())
+        except TimeoutError:
+            raise DeadlineExceededError("Request deadline is exceeded") from None
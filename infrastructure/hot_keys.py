@@ -0,0 +1,73 @@
+from collections import Counter, defaultdict
+from typing import Protocol
+
+from aiocache import BaseCache  # type: ignore
+from aiocache.backends.redis import RedisCache  # type: ignore
+
+from infrastructure.caches import ABCCaches
+from utils.logging import Logging
+
+
+class ABCHotKeys(Protocol):
+    async def record(self, kind: str, key: str) -> None:
+        raise NotImplementedError
+
+    async def top(self, kind: str, count: int) -> list[str]:
+        """
+        Most requested keys first
+        """
+        raise NotImplementedError
+
+
+class HotKeys(ABCHotKeys):
+    """
+    Request counts in a sorted set per kind, shared by all workers and kept
+    across restarts. Falls back to in-process counters for non-Redis backends.
+    """
+
+    def __init__(
+        self,
+        logging: Logging,
+        caches: ABCCaches,
+        ttl: int = 60 * 60 * 24 * 7,
+        max_keys: int = 10_000,
+    ) -> None:
+        """
+        ttl: the log is dropped if nothing is recorded for that long
+        max_keys: the least requested keys are trimmed above it
+        """
+        self._logger = logging.get_logger(__name__)
+        self._cache: BaseCache = caches.distributed
+        self._ttl = ttl
+        self._max_keys = max_keys
+        self._local: defaultdict[str, Counter[str]] = defaultdict(Counter)
+
+    def _key(self, kind: str) -> str:
+        return self._cache.build_key(f"hot-keys:{kind}")  # type: ignore
+
+    async def record(self, kind: str, key: str) -> None:
+        if not isinstance(self._cache, RedisCache):
+            self._local[kind][key] += 1
+            return
+        name = self._key(kind)
+        client = self._cache.client  # type: ignore
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.zincrby(name, 1, key)
+                pipe.zremrangebyrank(name, 0, -self._max_keys - 1)
+                pipe.expire(name, self._ttl)
+                await pipe.execute()
+        except Exception as e:
+            self._logger.error(f"Couldn't record hot key {kind}:{key}: {e}")
+
+    async def top(self, kind: str, count: int) -> list[str]:
+        if not isinstance(self._cache, RedisCache):
+            return [key for key, _ in self._local[kind].most_common(count)]
+        try:
+            keys = await self._cache.client.zrevrange(  # type: ignore
+                self._key(kind), 0, count - 1
+            )
+        except Exception as e:
+            self._logger.error(f"Couldn't read hot keys {kind}: {e}")
+            return []
+        return [key.decode() if isinstance(key, bytes) else key for key in keys]
@@ -1,13 +1,28 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import Any, Protocol
+from urllib.parse import urlencode
 
-from httpx import AsyncClient
-from tenacity import (retry, retry_if_exception_type, retry_if_result,
-                      stop_after_attempt, wait_exponential, wait_random)
+from httpx import (AsyncClient, AsyncHTTPTransport, Limits, Response, Timeout,
+                   TimeoutException, TransportError)
+from tenacity import (AsyncRetrying, RetryCallState, retry_if_exception,
+                      wait_exponential, wait_random)
 
+from infrastructure.caches import ABCCaches
+from infrastructure.deadline import Deadline
+from infrastructure.lifespan import ABCLifespan
+from utils.exceptions import DeadlineExceededError
 from utils.logging import Logging
 
 
 class ABCHTTPClient(Protocol):
+    async def start(self) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        raise NotImplementedError
+
     async def request(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
         raise NotImplementedError
 
@@ -17,32 +32,272 @@ class ABCHTTPClient(Protocol):
     async def post(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
         raise NotImplementedError
 
+    async def get_conditional(
+        self, url: str, params: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        """
+        GET that revalidates the previous response by its ETag/Last-Modified
+        """
+        raise NotImplementedError
+
+
+class RetryableStatusError(Exception):
+    def __init__(self, response: Response) -> None:
+        super().__init__(f"Status: {response.status_code}")
+        self.response = response
+
 
 class HTTPXUtils:
+    RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
     @staticmethod
-    def is_not_valid(value: Any) -> bool:
-        return not isinstance(value, dict) or not value
+    def is_retryable(exception: BaseException) -> bool:
+        return isinstance(exception, (TransportError, RetryableStatusError))
+
+    @staticmethod
+    def get_retry_after(response: Response) -> float | None:
+        """
+        Retry-After is either delay in seconds or HTTP date
+        """
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
 
 
 class HTTPXClient(ABCHTTPClient):
-    def __init__(self, logging: Logging) -> None:
+    """
+    Long-lived pooled client. Must be registered as a singleton
+    and started/closed by HTTPClientLifespan.
+    """
+
+    def __init__(
+        self,
+        logging: Logging,
+        caches: ABCCaches,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        timeout: float = 10.0,
+        hosts_max_connections: dict[str, int] | None = None,
+        max_attempts: int = 3,
+        max_retry_wait: float = 10.0,
+        validators_ttl: int = 60 * 60 * 24,
+    ) -> None:
+        """
+        timeout: per attempt, further limited by the request Deadline
+        validators_ttl: how long responses are kept for revalidation, at most
+            the TTL of the results cached from them, or the bodies pile up
+        """
         self._logger = logging.get_logger(__name__)
+        self._cache = caches.distributed
+        self._validators_ttl = validators_ttl
+        self._limits = Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._http2 = http2  # requires `h2` package
+        self._attempt_timeout = timeout
+        self._hosts_max_connections = hosts_max_connections or {}
+        self._client: AsyncClient | None = None
+
+        self._max_attempts = max_attempts
+        self._max_retry_wait = max_retry_wait
+        self._backoff = wait_exponential(multiplier=1, min=1, max=10) + wait_random(
+            min=0.1, max=0.5
+        )
+
+    def _make_mounts(self) -> dict[str, AsyncHTTPTransport]:
+        """
+        Dedicated pool for each configured host, e.g. {"www.googleapis.com": 50}
+        """
+        return {
+            f"all://{host}": AsyncHTTPTransport(
+                http2=self._http2,
+                limits=Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=min(
+                        max_connections,
+                        self._limits.max_keepalive_connections or max_connections,
+                    ),
+                    keepalive_expiry=self._limits.keepalive_expiry,
+                ),
+            )
+            for host, max_connections in self._hosts_max_connections.items()
+        }
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        self._logger.debug("Opening HTTP connection pool")
+        self._client = AsyncClient(
+            limits=self._limits,
+            http2=self._http2,
+            timeout=Timeout(self._attempt_timeout),
+            mounts=self._make_mounts(),  # type: ignore
+        )
+
+    async def close(self) -> None:
+        if self._client is None:
+            return
+        self._logger.debug("Closing HTTP connection pool")
+        client, self._client = self._client, None
+        await client.aclose()
+
+    async def _get_client(self) -> AsyncClient:
+        if self._client is None:
+            # Used outside of the app lifespan (e.g. scripts)
+            await self.start()
+        return self._client  # type: ignore
+
+    def _next_wait(self, retry_state: RetryCallState) -> float | None:
+        """
+        Returns None if the request shouldn't be retried
+        """
+        if retry_state.attempt_number >= self._max_attempts:
+            return None
+        wait = self._backoff(retry_state)
+        exception = retry_state.outcome.exception() if retry_state.outcome else None
+        if isinstance(exception, RetryableStatusError):
+            retry_after = HTTPXUtils.get_retry_after(exception.response)
+            if retry_after is not None:
+                if retry_after > self._max_retry_wait:
+                    return None
+                wait = retry_after
+        remaining = Deadline.remaining()
+        if remaining is not None and wait >= remaining:
+            return None
+        return wait
+
+    def _stop(self, retry_state: RetryCallState) -> bool:
+        return self._next_wait(retry_state) is None
+
+    def _wait(self, retry_state: RetryCallState) -> float:
+        return self._next_wait(retry_state) or 0
+
+    async def _send(self, *args: Any, **kwargs: Any) -> Response:
+        remaining = Deadline.check()
+        timeout = (
+            self._attempt_timeout
+            if remaining is None
+            else min(self._attempt_timeout, remaining)
+        )
+        client = await self._get_client()
+        response = await client.request(*args, timeout=timeout, **kwargs)
+        if response.status_code in HTTPXUtils.RETRYABLE_STATUSES:
+            raise RetryableStatusError(response)
+        return response
+
+    async def _request(self, *args: Any, **kwargs: Any) -> Response:
+        """
+        Retries transport errors and retryable statuses only,
+        other responses are returned to the caller as is
+        """
+        try:
+            async for attempt in AsyncRetrying(
+                retry=retry_if_exception(HTTPXUtils.is_retryable),
+                stop=self._stop,
+                wait=self._wait,
+                reraise=True,
+            ):
+                with attempt:
+                    response = await self._send(*args, **kwargs)
+                    self._logger.debug(f"Status: {response.status_code}")
+                    return response
+        except RetryableStatusError as e:
+            # Out of retries, the caller reads the error
+            self._logger.debug(f"Status: {e.response.status_code}")
+            return e.response
+        except TimeoutException as e:
+            remaining = Deadline.remaining()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceededError("Request deadline is exceeded") from e
+            raise
+        # The retrying loop either returns or reraises the last error
+        raise AssertionError("Unreachable")
 
-    @retry(
-        retry=retry_if_result(HTTPXUtils.is_not_valid)
-        | retry_if_exception_type(Exception),
-        stop=stop_after_attempt(2),
-        wait=wait_exponential(multiplier=1, min=1, max=10)
-        + wait_random(min=0.1, max=0.5),
-    )
     async def request(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
-        async with AsyncClient() as client:
-            response = await client.request(*args, **kwargs)
-        self._logger.debug(f"Status: {response.status_code}")
-        return response.json()
+        return (await self._request(*args, **kwargs)).json()
+
+    @staticmethod
+    def _validators_key(url: str, params: dict[str, Any]) -> str:
+        # Hashed to keep API keys out of the cache
+        query = urlencode(sorted(params.items()))
+        digest = hashlib.sha256(f"{url}?{query}".encode()).hexdigest()
+        return f"http-validators:{digest}"
+
+    async def get_conditional(
+        self, url: str, params: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        params = params or {}
+        key = self._validators_key(url, params)
+        try:
+            cached: dict[str, Any] | None = await self._cache.get(key)  # type: ignore
+        except Exception as e:
+            self._logger.error(f"Couldn't retrieve {key}: {e}")
+            cached = None
+
+        headers: dict[str, str] = {}
+        if cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = await self._request("GET", url, params=params, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            self._logger.debug(f"Not modified: {url}")
+            try:
+                await self._cache.expire(key, self._validators_ttl)  # type: ignore
+            except Exception as e:
+                self._logger.error(f"Couldn't extend {key}: {e}")
+            return cached["body"]
+
+        body = response.json()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 200 and (etag or last_modified):
+            try:
+                await self._cache.set(  # type: ignore
+                    key,
+                    {"etag": etag, "last_modified": last_modified, "body": body},
+                    ttl=self._validators_ttl,
+                )
+            except Exception as e:
+                self._logger.error(f"Couldn't set {key}: {e}")
+        return body
 
     async def get(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
         return await self.request("GET", *args, **kwargs)
 
     async def post(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
         return await self.request("POST", *args, **kwargs)
+
+
+class HTTPClientLifespan(ABCLifespan[None]):
+    def __init__(self, logging: Logging, http_client: ABCHTTPClient) -> None:
+        self._logger = logging.get_logger(__name__)
+        self._http_client = http_client
+
+    async def __aenter__(self) -> None:
+        await self._http_client.start()
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: Any,
+    ) -> None:
+        await self._http_client.close()
@@ -0,0 +1,83 @@
+import pickle
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class LRUMemoryCache:
+    """
+    In-process LRU cache bounded by entries count and approximate size in bytes.
+    Async API mirrors aiocache BaseCache methods used by Caches.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        # key -> (value, expires_at or 0, size)
+        self._entries: OrderedDict[str, tuple[Any, float, int]] = OrderedDict()
+        self._bytes = 0
+
+    @property
+    def size(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _sizeof(value: Any) -> int:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _pop(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        return True
+
+    def _get_entry(self, key: str) -> tuple[Any, float, int] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] and entry[1] <= time.monotonic():
+            self._pop(key)
+            return None
+        return entry
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        entry = self._get_entry(key)
+        if entry is None:
+            return default
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> bool:
+        self._pop(key)
+        size = self._sizeof(value)
+        if size > self._max_bytes:
+            return False
+        expires_at = time.monotonic() + ttl if ttl else 0
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+        while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+        return True
+
+    async def delete(self, key: str) -> int:
+        return int(self._pop(key))
+
+    async def exists(self, key: str) -> bool:
+        return self._get_entry(key) is not None
+
+    async def expire(self, key: str, ttl: float) -> bool:
+        entry = self._get_entry(key)
+        if entry is None:
+            return False
+        self._entries[key] = (entry[0], time.monotonic() + ttl if ttl else 0, entry[2])
+        return True
+
+    async def clear(self) -> bool:
+        self._entries.clear()
+        self._bytes = 0
+        return True
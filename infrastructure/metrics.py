@@ -0,0 +1,147 @@
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Sequence
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return f"{{{pairs}}}"
+
+
+class Metric:
+    type_ = "untyped"
+
+    def __init__(self, name: str, help_: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_
+        self.labels = tuple(labels)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.type_}",
+            *self.samples(),
+        ]
+
+
+class Counter(Metric):
+    type_ = "counter"
+
+    def __init__(self, name: str, help_: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help_, labels)
+        self._values: defaultdict[Labels, float] = defaultdict(float)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] += amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, labels)} {value}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Metric):
+    """
+    Value read at scrape time
+    """
+
+    type_ = "gauge"
+
+    def __init__(self, name: str, help_: str, func: Callable[[], float]) -> None:
+        super().__init__(name, help_)
+        self._func = func
+
+    def samples(self) -> list[str]:
+        return [f"{self.name} {self._func()}"]
+
+
+class Histogram(Metric):
+    type_ = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_, labels)
+        self._buckets = tuple(buckets)
+        # labels -> (counts per bucket and +Inf, sum)
+        self._values: dict[Labels, tuple[list[int], float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        empty = ([0] * (len(self._buckets) + 1), 0.0)
+        counts, total = self._values.get(labels) or empty
+        counts[bisect_left(self._buckets, value)] += 1
+        self._values[labels] = (counts, total + value)
+
+    def samples(self) -> list[str]:
+        samples: list[str] = []
+        names = (*self.labels, "le")
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self._buckets, "+Inf"), counts, strict=True):
+                cumulative += count
+                samples.append(
+                    f"{self.name}_bucket"
+                    f"{_format_labels(names, (*labels, str(bound)))} {cumulative}"
+                )
+            labels_text = _format_labels(self.labels, labels)
+            samples.append(f"{self.name}_sum{labels_text} {total}")
+            samples.append(f"{self.name}_count{labels_text} {cumulative}")
+        return samples
+
+
+class Metrics:
+    """
+    Registry of the worker metrics in the Prometheus text format.
+    Every worker has its own values.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_, labels))  # type: ignore
+
+    def gauge(self, name: str, help_: str, func: Callable[[], float]) -> Gauge:
+        return self._register(Gauge(name, help_, func))  # type: ignore
+
+    def histogram(
+        self,
+        name: str,
+        help_: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_, labels, buckets))  # type: ignore
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
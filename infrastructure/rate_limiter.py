@@ -0,0 +1,108 @@
+import asyncio
+import time
+from typing import Protocol
+
+from aiocache import BaseCache  # type: ignore
+from aiocache.backends.redis import RedisCache  # type: ignore
+
+from infrastructure.caches import ABCCaches
+from infrastructure.deadline import Deadline
+from utils.exceptions import RateLimitError
+from utils.logging import Logging
+
+
+class ABCRateLimiter(Protocol):
+    async def acquire(self, key: str) -> None:
+        """
+        Wait for a token or raise RateLimitError
+        """
+        raise NotImplementedError
+
+
+class TokenBucketRateLimiter(ABCRateLimiter):
+    """
+    Token bucket shared by all workers through the distributed cache.
+    Falls back to an in-process bucket for non-Redis backends.
+    """
+
+    # Returns seconds to wait for the token, 0 if it was taken
+    _SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+    return tostring(wait)
+    """
+
+    def __init__(
+        self,
+        logging: Logging,
+        caches: ABCCaches,
+        rate: float,
+        capacity: int,
+        max_wait: float,
+    ) -> None:
+        """
+        rate: tokens per second, capacity: burst size,
+        max_wait: max seconds to wait for a token before RateLimitError
+        """
+        self._logger = logging.get_logger(__name__)
+        self._cache: BaseCache = caches.distributed
+        self._rate = rate
+        self._capacity = capacity
+        self._max_wait = max_wait
+        self._local_buckets: dict[str, tuple[float, float]] = {}
+
+    async def _take_shared(self, key: str) -> float:
+        wait = await self._cache.raw(  # type: ignore
+            "eval",
+            self._SCRIPT,
+            1,
+            self._cache.build_key(f"{key}-rate"),  # type: ignore
+            self._rate,
+            self._capacity,
+        )
+        return float(wait)  # type: ignore
+
+    def _take_local(self, key: str) -> float:
+        now = time.monotonic()
+        tokens, ts = self._local_buckets.get(key, (self._capacity, now))
+        tokens = min(self._capacity, tokens + (now - ts) * self._rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self._rate
+        self._local_buckets[key] = (tokens, now)
+        return wait
+
+    async def _take(self, key: str) -> float:
+        if not isinstance(self._cache, RedisCache):
+            return self._take_local(key)
+        try:
+            return await self._take_shared(key)
+        except Exception as e:
+            self._logger.error(f"Couldn't take token for {key}: {e}")
+            return self._take_local(key)
+
+    async def acquire(self, key: str) -> None:
+        max_wait = self._max_wait
+        if (remaining := Deadline.check()) is not None:
+            max_wait = min(max_wait, remaining)
+        deadline = time.monotonic() + max_wait
+        while wait := await self._take(key):
+            if time.monotonic() + wait > deadline:
+                raise RateLimitError(f"Rate limit for {key} is exceeded")
+            await asyncio.sleep(wait)
@@ -0,0 +1,136 @@
+import json
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Sequence, cast
+
+from aiocache.serializers import BaseSerializer  # type: ignore
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+_dumps: Callable[[Any], bytes] = _json_dumps
+_loads: Callable[[bytes], Any] = json.loads
+
+try:
+    import orjson  # type: ignore  # optional, `orjson` extra
+except ImportError:
+    pass
+else:
+    _dumps = orjson.dumps  # type: ignore
+    _loads = orjson.loads  # type: ignore
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    """
+    Cached value with the wall clock time it's fresh until
+    """
+
+    value: Any
+    fresh_until: float
+
+
+@dataclass(slots=True)
+class NegativeEntry:
+    """
+    Cached "not found" result
+    """
+
+    message: str
+
+
+class VersionedSerializer(BaseSerializer):
+    """
+    JSON payload behind a 2-byte header: schema version and compression flag.
+    Pydantic models are tagged by class name and validated back on load,
+    so only registered models can be instantiated from the cache.
+    Entries with another version (e.g. old pickles) are treated as misses.
+    Uses orjson if installed.
+    """
+
+    DEFAULT_ENCODING = None  # bytes
+    VERSION = 1
+    _PLAIN = 0
+    _ZLIB = 1
+
+    def __init__(
+        self,
+        *args: Any,
+        models: Sequence[type[BaseModel]] = (),
+        compress_threshold: int = 1024,
+        compress_level: int = 1,
+        **kwargs: Any,
+    ) -> None:
+        """
+        compress_threshold: payload size in bytes to compress from, 0 disables
+        """
+        super().__init__(*args, **kwargs)  # type: ignore
+        self._models = {model.__name__: model for model in models}
+        self._compress_threshold = compress_threshold
+        self._compress_level = compress_level
+
+    def _tag(self, value: Any) -> str | None:
+        if isinstance(value, BaseModel):
+            name = type(value).__name__
+        elif (
+            isinstance(value, list)
+            and (items := cast(list[Any], value))
+            and all(type(item) is type(items[0]) for item in items)
+            and isinstance(items[0], BaseModel)
+        ):
+            name = type(items[0]).__name__
+        else:
+            return None
+        if name not in self._models:
+            raise TypeError(f"Model {name} isn't registered in the serializer")
+        return name if isinstance(value, BaseModel) else f"list[{name}]"
+
+    def _untag(self, tag: str | None, data: Any) -> Any:
+        if tag is None:
+            return data
+        if tag.startswith("list[") and tag.endswith("]"):
+            model = self._models[tag[5:-1]]
+            return [model.model_validate(item) for item in data]
+        return self._models[tag].model_validate(data)
+
+    # Bytes in and out, as aiocache's PickleSerializer
+    def dumps(self, value: Any) -> bytes:  # type: ignore
+        envelope: dict[str, Any] = {}
+        if isinstance(value, NegativeEntry):
+            envelope["e"] = value.message
+            value = None
+        elif isinstance(value, CacheEntry):
+            envelope["f"] = value.fresh_until
+            value = value.value
+        envelope["t"] = self._tag(value)
+        envelope["d"] = to_jsonable_python(value, by_alias=True)
+        payload = _dumps(envelope)
+        flag = self._PLAIN
+        if self._compress_threshold and len(payload) >= self._compress_threshold:
+            payload = zlib.compress(payload, self._compress_level)
+            flag = self._ZLIB
+        return bytes((self.VERSION, flag)) + payload
+
+    def loads(self, value: bytes | None) -> Any:  # type: ignore
+        if value is None or len(value) < 2 or value[0] != self.VERSION:
+            return None
+        payload = value[2:]
+        if value[1] == self._ZLIB:
+            payload = zlib.decompress(payload)
+        elif value[1] != self._PLAIN:
+            return None
+        envelope = _loads(payload)
+        if "e" in envelope:
+            return NegativeEntry(envelope["e"])
+        try:
+            value = self._untag(envelope["t"], envelope["d"])
+        except (KeyError, ValueError):
+            # Unknown model or incompatible schema, reload from the source
+            return None
+        if "f" in envelope:
+            return CacheEntry(value, envelope["f"])
+        return value
@@ -0,0 +1,85 @@
+"""Unique book ISBN
+
+Revision ID: 7c3e9a41d2b5
+Revises: 2ad62680c112
+Create Date: 2026-10-18 20:12:45.118372
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c3e9a41d2b5"
+down_revision: Union[str, None] = "2ad62680c112"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Same as BookRepository._isbn: the Normalization.isbn form, 978- ISBN-13s
+    # become ISBN-10s, and invalid ISBNs are only stripped
+    op.execute(r"""
+        CREATE FUNCTION pg_temp.isbn10_check(digits text) RETURNS text
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT CASE check_digit WHEN 10 THEN 'X' ELSE check_digit::text END
+            FROM (
+                SELECT (11 - sum((11 - i) * substr(digits, i, 1)::int) % 11) % 11
+                FROM generate_series(1, 9) AS i
+            ) AS c(check_digit)
+        $$;
+
+        CREATE FUNCTION pg_temp.isbn13_check(digits text) RETURNS text
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT ((10 - sum(
+                CASE WHEN i % 2 = 0 THEN 3 ELSE 1 END * substr(digits, i, 1)::int
+            ) % 10) % 10)::text
+            FROM generate_series(1, 12) AS i
+        $$;
+
+        -- Nested CASEs, AND doesn't guarantee the digits are checked first
+        CREATE FUNCTION pg_temp.normalized_isbn(value text) RETURNS text
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT coalesce(
+                CASE
+                    WHEN isbn ~ '^[0-9]{9}[0-9X]$' THEN
+                        CASE WHEN pg_temp.isbn10_check(isbn) = right(isbn, 1)
+                        THEN isbn END
+                    WHEN isbn ~ '^[0-9]{13}$' THEN
+                        CASE
+                            WHEN pg_temp.isbn13_check(isbn) <> right(isbn, 1)
+                            THEN NULL
+                            WHEN isbn LIKE '978%' THEN substr(isbn, 4, 9)
+                                || pg_temp.isbn10_check(substr(isbn, 4, 9))
+                            ELSE isbn
+                        END
+                END,
+                regexp_replace(value, '^\s+|\s+$', '', 'g')
+            )
+            FROM (SELECT upper(regexp_replace(value, '[\s-]+', '', 'g'))) AS n(isbn)
+        $$;
+
+        UPDATE books SET isbn = pg_temp.normalized_isbn(isbn)
+        WHERE isbn IS DISTINCT FROM pg_temp.normalized_isbn(isbn);
+    """)
+    # Keep the oldest book of every ISBN and move the authors of the others to it,
+    # ISBN-13 and ISBN-10 duplicates now share one
+    op.execute("""
+        CREATE TEMP TABLE duplicate_books ON COMMIT DROP AS
+        SELECT id, first_value(id) OVER (
+            PARTITION BY isbn ORDER BY created_at, id
+        ) AS kept_id
+        FROM books;
+        DELETE FROM duplicate_books WHERE id = kept_id;
+        INSERT INTO authors_books (author_id, book_id)
+        SELECT ab.author_id, d.kept_id
+        FROM authors_books ab JOIN duplicate_books d ON d.id = ab.book_id
+        ON CONFLICT DO NOTHING;
+        DELETE FROM books WHERE id IN (SELECT id FROM duplicate_books);
+    """)
+    op.create_unique_constraint("books_isbn_key", "books", ["isbn"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("books_isbn_key", "books", type_="unique")
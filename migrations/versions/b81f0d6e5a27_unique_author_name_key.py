@@ -0,0 +1,49 @@
+"""Unique author name key
+
+Revision ID: b81f0d6e5a27
+Revises: 7c3e9a41d2b5
+Create Date: 2026-10-18 20:58:03.604915
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b81f0d6e5a27"
+down_revision: Union[str, None] = "7c3e9a41d2b5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("authors", sa.Column("name_key", sa.String(), nullable=True))
+    # Same as Normalization.author
+    op.execute(r"""
+        UPDATE authors
+        SET name_key = lower(btrim(regexp_replace(name, '\s+', ' ', 'g')))
+    """)
+    # Keep the oldest author of every key and move the books of the others to it
+    op.execute("""
+        CREATE TEMP TABLE duplicate_authors ON COMMIT DROP AS
+        SELECT id, first_value(id) OVER (
+            PARTITION BY name_key ORDER BY created_at, id
+        ) AS kept_id
+        FROM authors;
+        DELETE FROM duplicate_authors WHERE id = kept_id;
+        INSERT INTO authors_books (author_id, book_id)
+        SELECT d.kept_id, ab.book_id
+        FROM authors_books ab JOIN duplicate_authors d ON d.id = ab.author_id
+        ON CONFLICT DO NOTHING;
+        DELETE FROM authors WHERE id IN (SELECT id FROM duplicate_authors);
+    """)
+    op.alter_column("authors", "name_key", nullable=False)
+    op.create_unique_constraint("authors_name_key_key", "authors", ["name_key"])
+
+
+def downgrade() -> None:
+    # Merged duplicates aren't restored
+    op.drop_constraint("authors_name_key_key", "authors", type_="unique")
+    op.drop_column("authors", "name_key")
@@ -0,0 +1,62 @@
+"""Trigram search indexes
+
+Revision ID: c4a8e2f19d36
+Revises: b81f0d6e5a27
+Create Date: 2026-10-18 21:40:17.260184
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4a8e2f19d36"
+down_revision: Union[str, None] = "b81f0d6e5a27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ("title", "isbn", "category")
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY doesn't lock the table for writes but can't run in a transaction.
+    # A failed build leaves an invalid index, drop it before retrying.
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.create_index(
+                f"ix_books_{column}_trgm",
+                "books",
+                [column],
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        # Authors of the found books are loaded by book_id, and deleted books
+        # are cascaded by it, which the (author_id, book_id) key can't serve
+        op.create_index(
+            "ix_authors_books_book_id",
+            "authors_books",
+            ["book_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_authors_books_book_id",
+            "authors_books",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        for column in COLUMNS:
+            op.drop_index(
+                f"ix_books_{column}_trgm",
+                "books",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,101 @@
+"""Books full-text search
+
+Revision ID: d52b7e1f8a94
+Revises: c4a8e2f19d36
+Create Date: 2026-10-18 22:31:52.904417
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "d52b7e1f8a94"
+down_revision: Union[str, None] = "c4a8e2f19d36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "books", sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True)
+    )
+    # Weights: title A, authors B, category C.
+    # The config must match BookRepository.TEXT_SEARCH_CONFIG.
+    op.execute("""
+        CREATE FUNCTION books_search_vector(title text, category text, book_id uuid)
+        RETURNS tsvector LANGUAGE sql STABLE AS $$
+            SELECT
+                setweight(to_tsvector('english', coalesce(title, '')), 'A')
+                || setweight(to_tsvector('english', coalesce((
+                    SELECT string_agg(a.name, ' ')
+                    FROM authors_books ab JOIN authors a ON a.id = ab.author_id
+                    WHERE ab.book_id = $3
+                ), '')), 'B')
+                || setweight(to_tsvector('english', coalesce(category, '')), 'C')
+        $$;
+
+        CREATE FUNCTION books_search_vector_update() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.search_vector := books_search_vector(NEW.title, NEW.category, NEW.id);
+            RETURN NEW;
+        END $$;
+
+        CREATE TRIGGER books_search_vector
+        BEFORE INSERT OR UPDATE OF title, category ON books
+        FOR EACH ROW EXECUTE FUNCTION books_search_vector_update();
+    """)
+    # Statement triggers recompute every book once per bulk insert of links
+    op.execute("""
+        CREATE FUNCTION authors_books_search_vector_update() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE books b
+            SET search_vector = books_search_vector(b.title, b.category, b.id)
+            WHERE b.id IN (SELECT DISTINCT book_id FROM changed_links);
+            RETURN NULL;
+        END $$;
+
+        CREATE TRIGGER authors_books_search_vector_insert
+        AFTER INSERT ON authors_books REFERENCING NEW TABLE AS changed_links
+        FOR EACH STATEMENT EXECUTE FUNCTION authors_books_search_vector_update();
+
+        CREATE TRIGGER authors_books_search_vector_delete
+        AFTER DELETE ON authors_books REFERENCING OLD TABLE AS changed_links
+        FOR EACH STATEMENT EXECUTE FUNCTION authors_books_search_vector_update();
+    """)
+    op.execute(
+        "UPDATE books SET search_vector = books_search_vector(title, category, id)"
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_books_search_vector",
+            "books",
+            ["search_vector"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_books_search_vector",
+            "books",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.execute("""
+        DROP TRIGGER authors_books_search_vector_delete ON authors_books;
+        DROP TRIGGER authors_books_search_vector_insert ON authors_books;
+        DROP FUNCTION authors_books_search_vector_update();
+        DROP TRIGGER books_search_vector ON books;
+        DROP FUNCTION books_search_vector_update();
+        DROP FUNCTION books_search_vector(text, text, uuid);
+    """)
+    op.drop_column("books", "search_vector")
@@ -0,0 +1,41 @@
+"""Trigram author index
+
+Revision ID: e3f0a9c47b18
+Revises: d52b7e1f8a94
+Create Date: 2026-10-18 23:05:44.613029
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e3f0a9c47b18"
+down_revision: Union[str, None] = "d52b7e1f8a94"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # pg_trgm is created by c4a8e2f19d36
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_authors_name_key_trgm",
+            "authors",
+            ["name_key"],
+            postgresql_using="gin",
+            postgresql_ops={"name_key": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_authors_name_key_trgm",
+            "authors",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -11,6 +11,7 @@ from infrastructure.lifespan import ABCLifespan
 from presentation.asgi.abc_builder import ASGIApp, ASGIAppBuilder
 from presentation.asgi.fastapi.abc_router import ABCRouterBuilder
 from presentation.asgi.fastapi.exception_handler import exception_handler
+from presentation.asgi.fastapi.read_your_writes import ReadYourWritesCookie
 from utils.logging import Logging
 
 
@@ -20,10 +21,16 @@ class FastAPIAppBuilder(ASGIAppBuilder):
         logging: Logging,
         router_builders: list[ABCRouterBuilder],
         lifespans: list[ABCLifespan],  # type: ignore - hack for DI Container
+        read_your_writes: float = 0.0,
     ) -> None:
+        """
+        read_your_writes: seconds a client reads from the primary after its
+            write, 0 without replicas
+        """
         self._logger = logging.get_logger(__name__)
         self._router_builders = router_builders
         self._lifespans: list[ABCLifespan[Any]] = lifespans
+        self._read_your_writes = read_your_writes
 
     def create_app(self) -> ASGIApp:
         self._app = _FastAPI(lifespan=self._lifespan_for_every_worker)
@@ -36,6 +43,9 @@ class FastAPIAppBuilder(ASGIAppBuilder):
             router = router_builder.create_router()
             self._app.include_router(router)
 
+        if self._read_your_writes > 0:
+            self._app.middleware("http")(ReadYourWritesCookie(self._read_your_writes))
+
         @self._app.exception_handler(Exception)
         async def _(request: Any, exception: Exception) -> Any:
             return await exception_handler(request, exception)
@@ -0,0 +1,24 @@
+from fastapi import Request
+
+
+class ETag:
+    """
+    Weak validators for conditional GET
+    """
+
+    @staticmethod
+    def weak(version: str) -> str:
+        return f'W/"{version}"'
+
+    @staticmethod
+    def matches(request: Request, etag: str) -> bool:
+        """
+        If-None-Match uses weak comparison, so W/ prefixes are ignored
+        """
+        header = request.headers.get("If-None-Match")
+        if header is None:
+            return False
+        if header.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+        return etag.removeprefix("W/") in tags
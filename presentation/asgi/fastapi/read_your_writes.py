@@ -0,0 +1,37 @@
+import math
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+
+from infrastructure.db.read_your_writes import ReadYourWrites
+
+
+class ReadYourWritesCookie:
+    """
+    HTTP middleware keeping the client's last write time in a cookie, so its
+    next requests on any worker read from the primary until replicas catch up
+    """
+
+    NAME = "last_write"
+
+    def __init__(self, window: float) -> None:
+        self._window = window
+
+    async def __call__(
+        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
+    ) -> Response:
+        try:
+            written_at = float(request.cookies[self.NAME])
+        except (KeyError, ValueError):
+            written_at = None
+        with ReadYourWrites.start(written_at) as client:
+            response = await call_next(request)
+        if client.written_at is not None and client.written_at != written_at:
+            response.set_cookie(
+                self.NAME,
+                f"{client.written_at:.3f}",
+                max_age=math.ceil(self._window),
+                httponly=True,
+                samesite="lax",
+            )
+        return response
@@ -0,0 +1,6 @@
+from pydantic import BaseModel, Field
+
+
+class BooksBatchRequest(BaseModel):
+    isbns: list[str] = Field(default_factory=list)
+    ids: list[str] = Field(default_factory=list)  # Google Books volume IDs
@@ -1,13 +1,17 @@
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, AsyncIterator
 from uuid import UUID
 
-from fastapi import APIRouter, Security
+from fastapi import (APIRouter, Depends, Header, Query, Request, Response,
+                     Security)
 
 from core.models.user import User
 from core.services.book import BookService
+from infrastructure.deadline import Deadline
 from presentation.asgi.fastapi.abc_router import ABCRouterBuilder
 from presentation.asgi.fastapi.auth import ABCAuthService
+from presentation.asgi.fastapi.etag import ETag
+from presentation.asgi.requests.book import BooksBatchRequest
 from presentation.asgi.responses.base import BaseResponse
 from utils.logging import Logging
 
@@ -18,13 +22,46 @@ class BookRouterBuilder(ABCRouterBuilder):
         logging: Logging,
         auth_service: ABCAuthService,
         book_service: BookService,
+        deadline: float,
+        cache_control: str = "private, no-cache",
     ) -> None:
         self._logger = logging.get_logger(__name__)
         self._auth_service = auth_service
         self._book_service = book_service
+        self._deadline = deadline
+        self._cache_control = cache_control
+
+    async def _start_deadline(
+        self, x_request_timeout: Annotated[float | None, Header()] = None
+    ) -> AsyncIterator[None]:
+        """
+        Time budget for the whole request, clients can only shorten it
+        """
+        timeout = self._deadline
+        if x_request_timeout is not None and x_request_timeout > 0:
+            timeout = min(timeout, x_request_timeout)
+        with Deadline.start(timeout):
+            yield
+
+    def _not_modified(
+        self, request: Request, response: Response, version: str
+    ) -> Response | None:
+        """
+        Returns 304 if the client has this version, otherwise sets validators
+        on the response
+        """
+        headers = {"ETag": ETag.weak(version), "Cache-Control": self._cache_control}
+        if request.method == "GET" and ETag.matches(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return None
 
     def create_router(self) -> APIRouter:
-        router = APIRouter(prefix="/books", tags=["books"])
+        router = APIRouter(
+            prefix="/books",
+            tags=["books"],
+            dependencies=[Depends(self._start_deadline)],
+        )
         router.responses.update({
             400: {"model": BaseResponse},
             500: {"model": BaseResponse},
@@ -60,29 +97,64 @@ class BookRouterBuilder(ABCRouterBuilder):
             """
             return await self._book_service.fetch_by_category(category)
 
+        @router.post("/fetch_batch")
+        async def _(
+            _: Annotated[User, Security(self._auth_service.current_user(active=True))],
+            batch: BooksBatchRequest,
+        ):
+            """
+            Get books by many ISBNs and Google Books IDs and write them to the database.
+            Every item has its own result or error.
+            """
+            return await self._book_service.fetch_batch(batch.isbns, batch.ids)
+
         @router.get("/{book_id}")
         async def _(
             _: Annotated[User, Security(self._auth_service.current_user(active=True))],
+            request: Request,
+            response: Response,
             book_id: UUID,
         ):
             """
-            Get book by internal ID.
+            Get book by internal ID. Supports If-None-Match.
             """
+            version = await self._book_service.get_version(book_id)
+            if not_modified := self._not_modified(request, response, version):
+                return not_modified
             return await self._book_service.get_by_id(book_id)
 
-        @router.post(path="")
+        @router.api_route(path="", methods=["GET", "POST"])
         async def _(
             _: Annotated[User, Security(self._auth_service.current_user(active=True))],
+            request: Request,
+            response: Response,
             title: str | None = None,
             author: str | None = None,
             pub_date: datetime | None = None,
             isbn: str | None = None,
+            query: str | None = None,
+            cursor: str | None = None,
+            limit: Annotated[int | None, Query(ge=1)] = None,
         ):
             """
-            Search for books.
+            Search for books. GET supports If-None-Match.
+            Pass `next_cursor` of a page as `cursor` to get the next one, the
+            server caps the page size.
+            query: full-text search in titles, authors and categories, e.g.
+            `"machine learning" -python`. Returns one page of the most
+            relevant books.
             """
-            return await self._book_service.search(
-                title=title, author=author, isbn=isbn
+            books, next_cursor = await self._book_service.search(
+                text=query,
+                cursor=cursor,
+                limit=limit,
+                title=title,
+                author=author,
+                isbn=isbn,
             )
+            version = self._book_service.page_version(books, next_cursor)
+            if not_modified := self._not_modified(request, response, version):
+                return not_modified
+            return {"books": books, "next_cursor": next_cursor}
 
         return router
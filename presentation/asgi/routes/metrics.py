@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from infrastructure.metrics import Metrics
+from presentation.asgi.fastapi.abc_router import ABCRouterBuilder
+from utils.logging import Logging
+
+
+class MetricsRouterBuilder(ABCRouterBuilder):
+    def __init__(
+        self,
+        logging: Logging,
+        metrics: Metrics,
+    ) -> None:
+        self._logger = logging.get_logger(__name__)
+        self._metrics = metrics
+
+    def create_router(self) -> APIRouter:
+        router = APIRouter(tags=["metrics"])
+
+        @router.get("/metrics", include_in_schema=False)
+        async def _():
+            """
+            Metrics of the worker in the Prometheus text format.
+            """
+            return PlainTextResponse(
+                self._metrics.render(), media_type="text/plain; version=0.0.4"
+            )
+
+        return router
@@ -12,3 +12,19 @@ class LoudError(AppError):
 
 class ExternalValueError(QuietError):
     """Value error that should not be traced"""
+
+
+class NotFoundError(ExternalValueError):
+    """External resource doesn't exist, the result may be cached"""
+
+
+class ExternalServiceError(ExternalValueError):
+    """External service is unavailable or throttling"""
+
+
+class RateLimitError(ExternalServiceError):
+    """Client-side rate limit for external service is exceeded"""
+
+
+class DeadlineExceededError(ExternalServiceError):
+    """Request deadline is exceeded while waiting for external service"""
@@ -0,0 +1,50 @@
+import re
+
+from utils.exceptions import ExternalValueError
+
+
+class Normalization:
+    """
+    Canonical forms of user input, so equal values share cache keys
+    """
+
+    _SEPARATORS = re.compile(r"[\s-]+")
+    # [0-9] rather than \d or isdigit(), which accept other scripts' digits
+    _ISBN10 = re.compile(r"[0-9]{9}[0-9X]")
+    _ISBN13 = re.compile(r"[0-9]{13}")
+
+    @staticmethod
+    def _isbn10_check(digits: str) -> str:
+        total = sum((10 - i) * int(d) for i, d in enumerate(digits[:9]))
+        check = (11 - total % 11) % 11
+        return "X" if check == 10 else str(check)
+
+    @staticmethod
+    def _isbn13_check(digits: str) -> str:
+        total = sum((3 if i % 2 else 1) * int(d) for i, d in enumerate(digits[:12]))
+        return str((10 - total % 10) % 10)
+
+    @classmethod
+    def isbn(cls, value: str) -> str:
+        """
+        ISBN-10 without separators, or ISBN-13 if it has no ISBN-10 form (979-)
+        """
+        isbn = cls._SEPARATORS.sub("", value).upper()
+        if cls._ISBN10.fullmatch(isbn):
+            if cls._isbn10_check(isbn) == isbn[9]:
+                return isbn
+        elif cls._ISBN13.fullmatch(isbn):
+            if cls._isbn13_check(isbn) == isbn[12]:
+                if not isbn.startswith("978"):
+                    return isbn
+                return isbn[3:12] + cls._isbn10_check(isbn[3:12])
+        raise ExternalValueError(f"Invalid ISBN: {value}")
+
+    @staticmethod
+    def category(value: str) -> str:
+        return " ".join(value.split()).casefold()
+
+    @staticmethod
+    def author(value: str) -> str:
+        # lower() rather than casefold() to match lower() in Postgres
+        return " ".join(value.split()).lower()
@@ -13,8 +13,60 @@ class Settings(BaseSettings):
     debug: bool = False
 
     db_url: str = Field(default_factory=str)
+    db_pool_size: int = 5  # per worker
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0  # seconds
+    db_pool_recycle: int = -1  # seconds, -1 never
+    db_pool_pre_ping: bool = False
+    db_statement_cache_size: int = 100  # per connection, 0 disables
+    db_pgbouncer: bool = False  # transaction pooling compatible mode
+    db_replica_urls: list[str] = Field(default_factory=list)  # for read-only sessions
+    db_read_your_writes: float = 2.0  # seconds a client reads the primary after writing
+    db_replica_cooldown: float = 30.0  # seconds a failing replica is skipped
+    db_replica_connect_timeout: float = 1.0  # seconds, then reads use the primary
     cache_url: str = Field(default_factory=str)
-    cache_ttl: int = 60 * 60 * 24  # 1 day
+    cache_ttl: int = 60 * 60 * 24  # 1 day, stale entries are served until it
+    cache_soft_ttl: int = 60 * 60 * 12  # 12 hours, 0 disables background refresh
+    cache_refresh_ahead: float = 60.0  # seconds before cache_soft_ttl
+    cache_negative_ttl: int = 60 * 5  # 5 minutes, 0 disables caching of misses
+    cache_lock_lease: float = 5.0  # seconds, 0 disables cross-worker coalescing
+    cache_lock_poll_interval: float = 0.05  # seconds
+    cache_memory_ttl: int = 60  # seconds
+    cache_memory_max_entries: int = 10_000
+    cache_memory_max_bytes: int = 64 * 1024 * 1024  # 64 MiB per worker
+    cache_compress_threshold: int = 1024  # bytes, 0 disables compression
     secret_key: str = "secret_key"
     openapi_token_url: str = "/auth/login"
     google_api_key: str = Field(default_factory=str)
+    google_books_rate: float = 10.0  # requests per second for all workers
+    google_books_burst: int = 20
+    google_books_rate_limit_wait: float = 2.0  # seconds
+    google_books_failure_threshold: int = 5
+    google_books_recovery_timeout: float = 30.0  # seconds
+    google_books_page_size: int = 40
+    google_books_prefetch_pages: int = 2
+    google_books_max_books: int = 400  # per search
+
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0  # seconds
+    http_http2: bool = False  # requires `h2` package
+    http_timeout: float = 10.0  # seconds
+    http_hosts_max_connections: dict[str, int] = Field(default_factory=dict)
+    http_max_attempts: int = 3
+    http_max_retry_wait: float = 10.0  # seconds, longer Retry-After isn't retried
+    http_validators_ttl: int = 60 * 60 * 24  # 1 day, capped to cache_ttl
+    request_deadline: float = 15.0  # seconds
+    hot_keys_ttl: int = 60 * 60 * 24 * 7  # 1 week without requests
+    hot_keys_max: int = 10_000
+    warmup_top_n: int = 100  # hot ISBNs and categories each, 0 disables
+    warmup_isbns: list[str] = Field(default_factory=list)
+    warmup_categories: list[str] = Field(default_factory=list)
+    warmup_concurrency: int = 4
+    warmup_budget: float = 10.0  # seconds of startup
+    response_cache_control: str = "private, no-cache"  # for ETag endpoints
+    batch_concurrency: int = 8
+    batch_max_items: int = 100
+    upsert_batch_size: int = 40  # streamed books written per transaction
+    search_limit: int = 20  # page size without a limit
+    search_max_limit: int = 100